@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import tkinter as tk
 import re
 import queue
 import math
@@ -9,8 +10,18 @@ class AIBaseMixin:
 
     def _update_status_threadsafe(self, message):
         self.ai_status_queue.put(message)
-
-    def _process_queue(self):
+        # Wake the Tk loop to drain the queue now instead of polling it on a timer.
+        try: self.root.event_generate('<<AIStatus>>', when='tail')
+        except (tk.TclError, RuntimeError):
+            try: self.root.after(0, self._process_queue)
+            except (tk.TclError, RuntimeError): pass
+
+    def _poll_ai_queue(self):
+        # Slow safety net for messages whose wake-up event was lost.
+        self._process_queue()
+        self.root.after(1000, self._poll_ai_queue)
+
+    def _process_queue(self, event=None):
         try:
             while True:
                 message = self.ai_status_queue.get_nowait()
@@ -24,10 +35,7 @@ class AIBaseMixin:
                 else:
                     self.status_var.set(message)
                     self.progress_bar.start()
-
-                self.root.update()
         except queue.Empty: pass
-        self.root.after(100, self._process_queue)
 
     def _retrieve_similar_examples(self, query_text, top_k):
         """
@@ -6,7 +6,6 @@ import uuid
 import re
 import traceback
 import threading
-import torch
 import queue
 from bisect import bisect_left, bisect_right
 
@@ -54,10 +53,7 @@ class AIMixin:
         memory_annotations = []
         if not final_mapping: return memory_annotations
 
-        line_starts = [0]
-        for i, char in enumerate(content):
-            if char == '\n': line_starts.append(i + 1)
-        line_starts.append(len(content) + 1)
+        line_starts = self._compute_line_starts(content)
 
         sorted_texts = sorted(final_mapping.keys(), key=len, reverse=True)
         chunk_size = 1500
@@ -73,10 +69,10 @@ class AIMixin:
                 if not tag: continue
 
                 start_index, end_index = match.span()
-                start_pos = self._char_offset_to_tkinter_index_from_offsets(line_starts, start_index)
-                end_pos = self._char_offset_to_tkinter_index_from_offsets(line_starts, end_index)
-                start_l, start_c = map(int, start_pos.split('.'))
-                end_l, end_c = map(int, end_pos.split('.'))
+                start_idx = bisect_right(line_starts, start_index) - 1
+                end_idx = bisect_right(line_starts, end_index) - 1
+                start_l, start_c = start_idx + 1, start_index - line_starts[start_idx]
+                end_l, end_c = end_idx + 1, end_index - line_starts[end_idx]
 
                 memory_annotations.append({
                     'id': uuid.uuid4().hex, 'start_line': start_l, 'start_char': start_c,
@@ -92,20 +88,32 @@ class AIMixin:
             added_memory_count, added_ai_count = 0, 0
             allow_overlap = self.allow_multilabel_overlap.get()
 
+            # Exact-span keys and merged-run overlap indexes replace a scan of the whole list per prediction.
+            existing_keys = {(e['start_line'], e['start_char'], e['end_line'], e['end_char'], e['tag']) for e in entities_list}
+            overlap_index = None if allow_overlap else self._build_overlap_index(entities_list)
             for ann in memory_anns:
-                is_dup = any(e['start_line'] == ann['start_line'] and e['start_char'] == ann['start_char'] and e['end_line'] == ann['end_line'] and e['end_char'] == ann['end_char'] and e['tag'] == ann['tag'] for e in entities_list)
-                if not is_dup and (allow_overlap or not self._is_overlapping_in_list(ann['start_line'], ann['start_char'], ann['end_line'], ann['end_char'], entities_list)):
-                    entities_list.append(ann)
-                    self._add_to_entity_lookup_map(ann)
-                    added_memory_count += 1
-
+                key = (ann['start_line'], ann['start_char'], ann['end_line'], ann['end_char'], ann['tag'])
+                if key in existing_keys: continue
+                start, end = (ann['start_line'], ann['start_char']), (ann['end_line'], ann['end_char'])
+                if overlap_index is not None and self._overlaps_index(overlap_index, start, end): continue
+                entities_list.append(ann)
+                existing_keys.add(key)
+                if overlap_index is not None: self._add_to_overlap_index(overlap_index, start, end)
+                self._add_to_entity_lookup_map(ann)
+                added_memory_count += 1
+
+            # Memory hits may overlap each other when overlaps are allowed; index the final list.
+            if overlap_index is None: overlap_index = self._build_overlap_index(entities_list)
             for ann in ai_anns:
-                if not self._is_overlapping_in_list(ann['start_line'], ann['start_char'], ann['end_line'], ann['end_char'], entities_list):
-                    entities_list.append(ann)
-                    self._add_to_entity_lookup_map(ann)
-                    added_ai_count += 1
+                start, end = (ann['start_line'], ann['start_char']), (ann['end_line'], ann['end_char'])
+                if self._overlaps_index(overlap_index, start, end): continue
+                entities_list.append(ann)
+                self._add_to_overlap_index(overlap_index, start, end)
+                self._add_to_entity_lookup_map(ann)
+                added_ai_count += 1
 
             entities_list.sort(key=lambda a: (a['start_line'], a['start_char']))
+            self._invalidate_entity_caches(self.current_file_path)
             self.apply_annotations_to_text()
             self.update_entities_list()
             self._update_button_states()
@@ -266,6 +274,7 @@ class AIMixin:
             self.ai_min_conf = min_conf_var.get()
             self.ai_max_conf = max_conf_var.get()
             self.ai_label_mapping = {ai_lbl: var.get() for ai_lbl, var in mapping_vars.items()}
+            self._dirty = True
 
             dialog.destroy()
             self._set_ai_models(model_names)
@@ -283,9 +292,13 @@ class AIMixin:
             if name in self.last_used_ai_models: self.last_used_ai_models.remove(name)
             self.last_used_ai_models.insert(0, name)
         self.last_used_ai_models = self.last_used_ai_models[:5]
+        self._dirty = True
 
     def _start_ai_annotation_process(self, model_names, label_mapping=None, min_conf=None, max_conf=None):
         if self._is_annotating_ai: return
+        if self._text_loading:
+            self.status_var.set("The file is still loading; try again once it has finished.")
+            return
         self._is_annotating_ai = True
         try: self.settings_menu.entryconfig("Pre-annotate with Hybrid AI...", state="disabled")
         except: pass
@@ -310,11 +323,20 @@ class AIMixin:
                 label_mapping["*"] = "-- Ignore --"
 
         try:
+            # Imported here so app startup never pays for torch/CUDA initialisation.
+            import torch
             from transformers import pipeline, AutoTokenizer
             def thread_target():
                 try:
                     self._update_status_threadsafe("1/2: Session Memory (Knowledge Base) processing...")
-                    memory_anns = self._get_memory_predictions(full_text)
+                    # Session-memory matching is pure Python; run it while the models load
+                    # (mostly disk and torch work) instead of before.
+                    memory_result = {'anns': [], 'error': None}
+                    def memory_target():
+                        try: memory_result['anns'] = self._get_memory_predictions(full_text)
+                        except Exception as e: memory_result['error'] = e
+                    memory_thread = threading.Thread(target=memory_target, daemon=True)
+                    memory_thread.start()
 
                     pipelines = []
                     for i, model_name in enumerate(model_names):
@@ -322,7 +344,9 @@ class AIMixin:
                         tokenizer = AutoTokenizer.from_pretrained(model_name)
                         try:
                             if torch.cuda.is_available():
-                                ner_pipeline = pipeline("token-classification", model=model_name, tokenizer=tokenizer, aggregation_strategy="max", device="cuda")
+                                # Half precision halves GPU memory traffic; argmax labels are unaffected in practice.
+                                half_dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+                                ner_pipeline = pipeline("token-classification", model=model_name, tokenizer=tokenizer, aggregation_strategy="max", device="cuda", torch_dtype=half_dtype)
                             else:
                                 raise RuntimeError("CUDA not available")
                         except (RuntimeError, torch.cuda.OutOfMemoryError) as e:
@@ -333,6 +357,9 @@ class AIMixin:
                     self._update_status_threadsafe("AI models loaded. Annotating text...")
                     ai_anns = self._get_ai_predictions(full_text, pipelines, label_mapping, min_conf, max_conf)
 
+                    memory_thread.join()
+                    if memory_result['error'] is not None: raise memory_result['error']
+                    memory_anns = memory_result['anns']
                     self.root.after(0, self._apply_ensemble_to_ui, memory_anns, ai_anns)
 
                 except Exception as e:
@@ -350,16 +377,11 @@ class AIMixin:
         try:
             all_detected_entities = []
 
-            line_starts = [0]
-            for i, char in enumerate(full_text):
-                if char == '\n': line_starts.append(i + 1)
-            line_starts.append(len(full_text) + 1)
+            line_starts = self._compute_line_starts(full_text)
 
-            def offset_to_tkinter(offset):
+            def offset_to_line_char(offset):
                 line_idx = bisect_right(line_starts, offset) - 1
-                line = line_idx + 1
-                char = offset - line_starts[line_idx]
-                return f"{line}.{char}"
+                return line_idx + 1, offset - line_starts[line_idx]
 
             def find_start_of_word(text, offset):
                 while offset > 0 and text[offset-1].isalnum(): offset -= 1
@@ -393,10 +415,8 @@ class AIMixin:
                 final_word = full_text[start_offset_clean:end_offset_clean]
                 if not final_word.strip(): return None
 
-                start_pos = offset_to_tkinter(start_offset_clean)
-                end_pos = offset_to_tkinter(end_offset_clean)
-                start_l, start_c = map(int, start_pos.split("."))
-                end_l, end_c = map(int, end_pos.split("."))
+                start_l, start_c = offset_to_line_char(start_offset_clean)
+                end_l, end_c = offset_to_line_char(end_offset_clean)
 
                 return {"id": uuid.uuid4().hex, "start_line": start_l, "start_char": start_c,
                         "end_line": end_l, "end_char": end_c, "text": final_word, "tag": tag,
@@ -424,22 +444,31 @@ class AIMixin:
                 if i + chunk_size_words >= len(word_spans): break
                 i += (chunk_size_words - overlap_words)
 
+            chunks = [chunk for chunk in chunks if chunk[2].strip()]
+            batch_size = 8
             for m_idx, ner_pipeline in enumerate(pipelines):
-                for c_idx, (chunk_start, chunk_end, chunk_text) in enumerate(chunks):
-                    self._update_status_threadsafe(f"Model {m_idx+1}/{len(pipelines)}: Annotating chunk {c_idx+1}/{len(chunks)}...")
-
-                    if not chunk_text.strip(): continue
+                for b_idx in range(0, len(chunks), batch_size):
+                    batch = chunks[b_idx:b_idx + batch_size]
+                    self._update_status_threadsafe(f"Model {m_idx+1}/{len(pipelines)}: Annotating chunks {b_idx+1}-{b_idx+len(batch)}/{len(chunks)}...")
 
                     try:
-                        chunk_results = ner_pipeline(chunk_text)
-                        for entity in chunk_results:
-                            abs_start = chunk_start + entity['start']
-                            abs_end = chunk_start + entity['end']
-                            new_ann = process_entity_chunk(entity, abs_start, abs_end)
-                            if new_ann: all_detected_entities.append(new_ann)
-
+                        # One pipeline call per batch lets the model run the chunks as padded batches.
+                        batch_results = ner_pipeline([chunk_text for _, _, chunk_text in batch], batch_size=len(batch))
                     except Exception as e:
-                        print(f"Warning on chunk {c_idx+1}: {e}")
+                        # Retry one chunk at a time so a single failing chunk does not drop the whole batch.
+                        print(f"Warning on chunks {b_idx+1}-{b_idx+len(batch)}: {e}")
+                        batch_results = None
+
+                    for c_idx, (chunk_start, _, chunk_text) in enumerate(batch):
+                        try:
+                            chunk_results = ner_pipeline(chunk_text) if batch_results is None else batch_results[c_idx]
+                            for entity in chunk_results:
+                                abs_start = chunk_start + entity['start']
+                                abs_end = chunk_start + entity['end']
+                                new_ann = process_entity_chunk(entity, abs_start, abs_end)
+                                if new_ann: all_detected_entities.append(new_ann)
+                        except Exception as e:
+                            print(f"Warning on chunk {b_idx+c_idx+1}: {e}")
 
             unique_annotations = {(ann['start_line'], ann['start_char'], ann['end_line'], ann['end_char'], ann['tag']): ann for ann in all_detected_entities}
             return list(unique_annotations.values())
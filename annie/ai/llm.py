@@ -4,10 +4,10 @@ from tkinter import messagebox
 from tkinter import ttk
 import json
 import uuid
-import re
 import threading
 from bisect import bisect_left, bisect_right
 import requests
+from annie.core import compile_word_pattern
 
 class LLMMixin:
     """Generative LLM few-shot agent."""
@@ -94,6 +94,7 @@ class LLMMixin:
             self.llm_model = model_var.get().strip()
             self.llm_models[self.llm_provider] = self.llm_model
             self.llm_few_shot_count = examples_var.get()
+            self._dirty = True
 
             entered_key = api_key_var.get().strip()
             if self.llm_provider == "Anthropic (Claude)": self.claude_api_key = entered_key
@@ -137,6 +138,9 @@ class LLMMixin:
 
     def _start_llm_agent(self):
         if getattr(self, '_is_annotating_ai', False): return
+        if self._text_loading:
+            self.status_var.set("The file is still loading; try again once it has finished.")
+            return
         self._is_annotating_ai = True
         self.status_var.set(f"Generative LLM ({self.llm_provider}) call in progress...")
         self.progress_bar.start()
@@ -229,31 +233,23 @@ class LLMMixin:
                 text_to_tag_map = {item['text'].strip(): item['tag'] for item in llm_annotations if item.get('text', '').strip()}
                 memory_anns = self._get_memory_predictions(full_text)
 
-                line_starts = [0]
-                for i, char in enumerate(full_text):
-                    if char == '\n': line_starts.append(i + 1)
-                line_starts.append(len(full_text) + 1)
+                line_starts = self._compute_line_starts(full_text)
 
-                def offset_to_tkinter(offset):
+                def offset_to_line_char(offset):
                     line_idx = bisect_right(line_starts, offset) - 1
-                    line = line_idx + 1
-                    char = offset - line_starts[line_idx]
-                    return f"{line}.{char}"
+                    return line_idx + 1, offset - line_starts[line_idx]
 
                 ai_anns = []
                 compiled_regexes = []
                 for text, tag in text_to_tag_map.items():
-                    pattern = r'\b' + re.escape(text) + r'\b'
-                    compiled_regexes.append((re.compile(pattern, re.IGNORECASE), tag, text))
+                    compiled_regexes.append((compile_word_pattern(text), tag, text))
                 compiled_regexes.sort(key=lambda x: len(x[2]), reverse=True)
 
                 for regex, tag, _ in compiled_regexes:
                     for match in regex.finditer(full_text):
                         matched_text = match.group()
-                        start_pos = offset_to_tkinter(match.span()[0])
-                        end_pos = offset_to_tkinter(match.span()[1])
-                        start_l, start_c = map(int, start_pos.split('.'))
-                        end_l, end_c = map(int, end_pos.split('.'))
+                        start_l, start_c = offset_to_line_char(match.start())
+                        end_l, end_c = offset_to_line_char(match.end())
 
                         ai_anns.append({
                             'id': uuid.uuid4().hex, 'start_line': start_l, 'start_char': start_c,
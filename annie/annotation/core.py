@@ -4,12 +4,13 @@ from tkinter import messagebox
 import uuid
 import traceback
 import os
+from annie.core import parse_text_index
 
 class AnnotationMixin:
     """Entity/relation annotation logic (sink)."""
 
     def annotate_selection(self):
-        if not self.current_file_path or not self.get_active_tags(): return
+        if not self.current_file_path or self._text_loading or not self.get_active_tags(): return
         original_state = self.text_area.cget('state')
         self.text_area.config(state=tk.NORMAL)
         try:
@@ -44,21 +45,19 @@ class AnnotationMixin:
 
             entities_in_file = self.annotations.get(self.current_file_path, {}).get("entities", [])
             if not self.allow_multilabel_overlap.get():
-                if self._is_overlapping_in_list(start_line, start_char, end_line, end_char, entities_in_file):
+                if self._overlaps_entities(self.current_file_path, start_line, start_char, end_line, end_char):
                     messagebox.showwarning("Overlap Detected", "Annotation overlaps with an existing one.", parent=self.root)
                     return
-            else:
-                for ann in entities_in_file:
-                    if (ann['start_line'] == start_line and ann['start_char'] == start_char and
-                        ann['end_line'] == end_line and ann['end_char'] == end_char and ann['tag'] == tag):
-                        self.status_var.set("This exact annotation already exists.")
-                        return
+            elif self._has_exact_entity(self.current_file_path, start_line, start_char, end_line, end_char, tag):
+                self.status_var.set("This exact annotation already exists.")
+                return
 
             entity_id = uuid.uuid4().hex
             annotation = {'id': entity_id, 'start_line': start_line, 'start_char': start_char,
                           'end_line': end_line, 'end_char': end_char, 'text': final_text, 'tag': tag}
             entities_in_file.append(annotation)
             self._add_to_entity_lookup_map(annotation)
+            self._invalidate_entity_caches(self.current_file_path)
 
             self.text_area.tag_remove(tk.SEL, "1.0", tk.END)
             self.apply_annotations_to_text()
@@ -133,6 +132,7 @@ class AnnotationMixin:
             if len(entities_to_keep) < initial_count:
                 affected_files.add(file_path)
                 data["entities"] = entities_to_keep
+                self._invalidate_entity_caches(file_path)
                 remaining_ids = {e['id'] for e in entities_to_keep}
                 orphaned_ids = ids_to_check - remaining_ids
                 if orphaned_ids and "relations" in data:
@@ -166,38 +166,28 @@ class AnnotationMixin:
             if confirm_result["option"]:
                 self._remove_text_tag_from_corpus(rep_text, rep_tag)
             else:
-                all_iids_before = self.entities_tree.get_children()
+                # Only the rows sharing the first entity's id can be its row.
                 next_selection_index = 0
-                if all_iids_before:
-                    try:
-                        first_id, first_sl, first_sc, first_el, first_ec, first_tag = (
-                            first_entity['id'], first_entity['start_line'], first_entity['start_char'],
-                            first_entity['end_line'], first_entity['end_char'], first_entity['tag'])
-                        for i, iid in enumerate(all_iids_before):
-                            parts = iid.split('|')
-                            if (parts[1] == first_id and int(parts[2].split('.')[0]) == first_sl and int(parts[2].split('.')[1]) == first_sc and
-                                int(parts[3].split('.')[0]) == first_el and int(parts[3].split('.')[1]) == first_ec and parts[4] == first_tag):
-                                next_selection_index = i
-                                break
-                    except (ValueError, IndexError): pass
+                for iid in self._entity_id_to_tree_iids.get(first_entity['id'], ()):
+                    if self._lookup_entity_from_iid(iid) is first_entity:
+                        try: next_selection_index = self.entities_tree.index(iid)
+                        except tk.TclError: pass
+                        break
 
                 entities_in_file = self.annotations.get(self.current_file_path, {}).get("entities", [])
                 ids_to_remove = {e['id'] for e in entities_to_delete}
                 for item in entities_to_delete:
                     if item in entities_in_file: entities_in_file.remove(item)
-                    key = (item['id'], item['start_line'], item['start_char'], item['end_line'], item['end_char'], item['tag'])
-                    self._entity_lookup_map.pop(key, None)
+                    self._remove_from_entity_lookup_map(item)
+                self._invalidate_entity_caches(self.current_file_path)
 
                 relations = self.annotations[self.current_file_path].get("relations", [])
                 if relations:
-                    remaining_ids = {e['id'] for e in entities_in_file}
-                    orphaned_ids = ids_to_remove - remaining_ids
+                    orphaned_ids = {eid for eid in ids_to_remove if eid not in self._entity_lookup_map}
                     if orphaned_ids:
                         self.annotations[self.current_file_path]["relations"] = [r for r in relations if r['head_id'] not in orphaned_ids and r['tail_id'] not in orphaned_ids]
 
-                self.apply_annotations_to_text()
-                self.update_relations_list()
-                self.update_entities_list(selection_hint=next_selection_index)
+                self._schedule_refresh(entities=True, relations=True, highlight=True, selection_hint=next_selection_index)
                 self.status_var.set(f"Removed {len(entities_to_delete)} entity instance(s).")
         finally:
             self._is_deleting = False
@@ -209,14 +199,8 @@ class AnnotationMixin:
             return
         entities_to_delete = []
         for iid in selected_iids:
-            try:
-                parts = iid.split('|')
-                if len(parts) < 6: continue
-                entity_key = (parts[1], int(parts[2].split('.')[0]), int(parts[2].split('.')[1]),
-                              int(parts[3].split('.')[0]), int(parts[3].split('.')[1]), parts[4])
-                entity_dict = self._entity_lookup_map.get(entity_key)
-                if entity_dict: entities_to_delete.append(entity_dict)
-            except (ValueError, IndexError): continue
+            entity_dict = self._lookup_entity_from_iid(iid)
+            if entity_dict: entities_to_delete.append(entity_dict)
         self._handle_entity_deletion(entities_to_delete)
 
     def merge_selected_entities(self):
@@ -224,15 +208,9 @@ class AnnotationMixin:
         if len(selected_tree_iids) < 2: return
         selected_entities_data = []
         for tree_iid in selected_tree_iids:
-            try:
-                parts = tree_iid.split('|')
-                if len(parts) < 6: continue
-                entity_key = (parts[1], int(parts[2].split('.')[0]), int(parts[2].split('.')[1]),
-                              int(parts[3].split('.')[0]), int(parts[3].split('.')[1]), parts[4])
-                entity_dict = self._entity_lookup_map.get(entity_key)
-                if entity_dict and entity_dict not in selected_entities_data:
-                    selected_entities_data.append(entity_dict)
-            except Exception: pass
+            entity_dict = self._lookup_entity_from_iid(tree_iid)
+            if entity_dict and entity_dict not in selected_entities_data:
+                selected_entities_data.append(entity_dict)
 
         if len(selected_entities_data) < 2: return
         selected_entities_data.sort(key=lambda e: (e['start_line'], e['start_char']))
@@ -243,11 +221,10 @@ class AnnotationMixin:
         if not ids_to_change: return
         for entity in selected_entities_data:
             if entity['id'] in ids_to_change:
-                old_key = (entity['id'], entity['start_line'], entity['start_char'], entity['end_line'], entity['end_char'], entity['tag'])
-                self._entity_lookup_map.pop(old_key, None)
+                self._remove_from_entity_lookup_map(entity)
                 entity['id'] = canonical_id
-                new_key = (entity['id'], entity['start_line'], entity['start_char'], entity['end_line'], entity['end_char'], entity['tag'])
-                self._entity_lookup_map[new_key] = entity
+                self._add_to_entity_lookup_map(entity)
+        self._invalidate_entity_caches(self.current_file_path)
 
         relations = self.annotations[self.current_file_path].get("relations", [])
         if relations:
@@ -257,30 +234,19 @@ class AnnotationMixin:
             unique_relations = { (r['head_id'], r['type'], r['tail_id']): r for r in relations }.values()
             self.annotations[self.current_file_path]['relations'] = list(unique_relations)
 
-        self.update_entities_list()
-        self.update_relations_list()
-        self.apply_annotations_to_text()
+        self._schedule_refresh(entities=True, relations=True, highlight=True)
 
     def _on_text_right_click(self, event):
-        if not self.current_file_path: return
+        if not self.current_file_path or self._text_loading: return
         try:
-            click_index_str = self.text_area.index(f"@{event.x},{event.y}")
-            click_pos = tuple(map(int, click_index_str.split('.')))
+            click_line, click_char = parse_text_index(self.text_area.index(f"@{event.x},{event.y}"))
         except (tk.TclError, ValueError): return
 
-        entities = self.annotations.get(self.current_file_path, {}).get("entities", [])
-        clicked_entity = None
-        for entity in reversed(entities):
-            start_pos_tuple = (entity['start_line'], entity['start_char'])
-            end_pos_tuple = (entity['end_line'], entity['end_char'])
-            if start_pos_tuple <= click_pos < end_pos_tuple:
-                clicked_entity = entity
-                break
-
+        clicked_entity = self._find_entity_at(self.current_file_path, click_line, click_char)
         if not clicked_entity: return
         context_menu = tk.Menu(self.root, tearoff=0)
         entity_id = clicked_entity['id']
-        count = sum(1 for e in entities if e['id'] == entity_id)
+        count = len(self._entity_lookup_map.get(entity_id, ()))
 
         if count > 1:
             context_menu.add_command(label="Demerge This Instance", command=lambda e=clicked_entity: self.demerge_entity(e))
@@ -289,67 +255,79 @@ class AnnotationMixin:
         context_menu.tk_popup(event.x_root, event.y_root)
 
     def demerge_entity(self, entity_to_demerge):
-        old_key = (entity_to_demerge['id'], entity_to_demerge['start_line'], entity_to_demerge['start_char'],
-                   entity_to_demerge['end_line'], entity_to_demerge['end_char'], entity_to_demerge['tag'])
-        self._entity_lookup_map.pop(old_key, None)
+        self._remove_from_entity_lookup_map(entity_to_demerge)
         entity_to_demerge['id'] = uuid.uuid4().hex
         self._add_to_entity_lookup_map(entity_to_demerge)
-        self.update_entities_list()
-        self.apply_annotations_to_text()
+        self._invalidate_entity_caches(self.current_file_path)
+        self._schedule_refresh(entities=True, highlight=True)
 
     def on_entity_select(self, event=None):
+        if self._entities_tree_rebuilding: return
         selected_tree_iids = self.entities_tree.selection()
-        unique_ids = set()
-        for iid in selected_tree_iids:
-            try: unique_ids.add(iid.split('|')[1])
-            except IndexError: pass
-        self.selected_entity_ids_for_relation = list(unique_ids)
+        selected_values = [self._iid_to_values[iid] for iid in selected_tree_iids if iid in self._iid_to_values]
+        self.selected_entity_ids_for_relation = {values[0] for values in selected_values}
         original_state = self.text_area.cget('state')
         self.text_area.config(state=tk.NORMAL)
         try:
             self.text_area.tag_remove("selection_highlight", "1.0", tk.END)
-            first_pos = None
-            for iid in selected_tree_iids:
-                try:
-                    parts = iid.split('|')
-                    start_pos, end_pos = parts[2], parts[3]
-                    self.text_area.tag_add("selection_highlight", start_pos, end_pos)
-                    if first_pos is None: first_pos = start_pos
-                except (IndexError, tk.TclError): pass
-            if first_pos: self.text_area.see(first_pos)
+            # One 'tag add' with every start/end pair instead of one Tcl call per row.
+            highlight_ranges = [pos for values in selected_values for pos in (values[1], values[2])]
+            if highlight_ranges:
+                try: self.text_area.tag_add("selection_highlight", *highlight_ranges)
+                except tk.TclError: pass
+                self.text_area.see(highlight_ranges[0])
         finally:
             if self.text_area.winfo_exists(): self.text_area.config(state=original_state)
         self._update_button_states()
 
     def add_relation(self):
+        if self._text_loading: return
         if len(self.selected_entity_ids_for_relation) != 2: return
         head_id, tail_id = self.selected_entity_ids_for_relation
         relation_type = self.selected_relation_type.get()
         if not relation_type: return
         relations_list = self.annotations.setdefault(self.current_file_path, {}).setdefault("relations", [])
-        if any(r['head_id'] == head_id and r['tail_id'] == tail_id and r['type'] == relation_type for r in relations_list): return
+        relations_by_id, relation_keys = self._get_relation_index(self.current_file_path)
+        relation_key = (head_id, tail_id, relation_type)
+        if relation_key in relation_keys: return
         new_relation = {"id": uuid.uuid4().hex, "type": relation_type, "head_id": head_id, "tail_id": tail_id}
         relations_list.append(new_relation)
-        self.update_relations_list()
+        relations_by_id[new_relation['id']] = new_relation
+        relation_keys.add(relation_key)
+        self._dirty = True
+        self._insert_relation_row(new_relation)
 
     def flip_selected_relation(self):
+        if self._text_loading: return
         selected_iids = self.relations_tree.selection()
         if not selected_iids: return
         relation_id = selected_iids[0]
-        relations = self.annotations[self.current_file_path].get("relations", [])
-        for rel in relations:
-            if rel['id'] == relation_id:
-                rel['head_id'], rel['tail_id'] = rel['tail_id'], rel['head_id']
-                self.update_relations_list()
-                break
+        relations_by_id, relation_keys = self._get_relation_index(self.current_file_path)
+        rel = relations_by_id.get(relation_id)
+        if not rel: return
+        current_key = (rel['head_id'], rel['tail_id'], rel['type'])
+        flipped_key = (rel['tail_id'], rel['head_id'], rel['type'])
+        if flipped_key != current_key and flipped_key in relation_keys:
+            self.status_var.set("Flip skipped: the reversed relation already exists.")
+            return
+        relation_keys.discard(current_key)
+        rel['head_id'], rel['tail_id'] = rel['tail_id'], rel['head_id']
+        relation_keys.add(flipped_key)
+        self._dirty = True
+        self._update_relation_row(rel)
 
     def remove_relation_annotation(self, event=None):
+        if self._text_loading: return
         selected_iids = self.relations_tree.selection()
         if not selected_iids: return
         relation_id = selected_iids[0]
-        relations = self.annotations[self.current_file_path].get("relations", [])
-        self.annotations[self.current_file_path]["relations"] = [r for r in relations if r['id'] != relation_id]
-        self.update_relations_list()
+        relations_by_id, relation_keys = self._get_relation_index(self.current_file_path)
+        rel = relations_by_id.pop(relation_id, None)
+        if not rel: return
+        relation_keys.discard((rel['head_id'], rel['tail_id'], rel['type']))
+        self.annotations[self.current_file_path]["relations"].remove(rel)
+        self._dirty = True
+        self._remove_relation_row(relation_id)
 
     def on_relation_select(self, event=None):
         # Clear previous relation highlight + entities tree selection
@@ -372,11 +350,8 @@ class AnnotationMixin:
             return
 
         relation_id = selected_iids[0]
-        relations = self.annotations.get(self.current_file_path, {}).get("relations", [])
-        entities = self.annotations.get(self.current_file_path, {}).get("entities", [])
-
         # Find the selected relation
-        selected_rel = next((r for r in relations if r['id'] == relation_id), None)
+        selected_rel = self._get_relation_index(self.current_file_path)[0].get(relation_id)
         if not selected_rel:
             self._update_button_states()
             return
@@ -389,16 +364,16 @@ class AnnotationMixin:
         original_state = self.text_area.cget('state')
         self.text_area.config(state=tk.NORMAL)
         try:
-            for entity in entities:
-                if entity['id'] not in (head_id, tail_id):
-                    continue
-                start_pos = f"{entity['start_line']}.{entity['start_char']}"
-                end_pos = f"{entity['end_line']}.{entity['end_char']}"
-                self.text_area.tag_add("relation_highlight", start_pos, end_pos)
+            # The id map holds exactly the head/tail instances; no need to scan every entity.
+            head_instances = self._entity_lookup_map.get(head_id, [])
+            tail_instances = self._entity_lookup_map.get(tail_id, []) if tail_id != head_id else []
+            highlight_ranges = []
+            for entity in head_instances + tail_instances:
+                highlight_ranges.extend((f"{entity['start_line']}.{entity['start_char']}", f"{entity['end_line']}.{entity['end_char']}"))
 
                 # Collect matching tree iids for entities list selection
-                matched_iids = self._entity_id_to_tree_iids.get(entity['id'], [])
-                entity_iids_to_select.update(matched_iids)
+                entity_iids_to_select.update(self._entity_id_to_tree_iids.get(entity['id'], ()))
+            self._batch_tag_add("relation_highlight", highlight_ranges)
 
             # Select matching entity rows in the treeview
             if entity_iids_to_select:
@@ -408,7 +383,7 @@ class AnnotationMixin:
                 self.entities_tree.focus(first_iid)
 
                 # Scroll text area to the head entity
-                head_entity = next((e for e in entities if e['id'] == head_id), None)
+                head_entity = head_instances[0] if head_instances else None
                 if head_entity:
                     self.text_area.see(f"{head_entity['start_line']}.{head_entity['start_char']}")
         except Exception:
@@ -2,7 +2,7 @@
 import tkinter as tk
 from tkinter import messagebox
 from tkinter import ttk
-import re
+from bisect import bisect_left
 
 class ManageMixin:
     """Entity-tag / relation-type management dialogs."""
@@ -36,16 +36,23 @@ class ManageMixin:
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
+        # One tree tag per entity tag, reconfigured only when its colour changes.
+        configured_colors = {}
+        # Main-window work owed when the dialog closes; set by the edits below.
+        pending = {'configure': False, 'highlight': False, 'entities': False}
+        removed_tags = set()
+
+        # Counted in one pass when the dialog opens; renames and merges move counts below.
+        tag_counts = {}
+        for data in self.annotations.values():
+            for entity in data.get("entities", []):
+                t = entity.get("tag")
+                if t: tag_counts[t] = tag_counts.get(t, 0) + 1
+
         def refresh_tree():
             tree.delete(*tree.get_children())
             hotkey_counter = 1
 
-            tag_counts = {}
-            for file_path, data in self.annotations.items():
-                for entity in data.get("entities", []):
-                    t = entity.get("tag")
-                    if t: tag_counts[t] = tag_counts.get(t, 0) + 1
-
             for layer, tags in self.tag_hierarchy.items():
                 layer_active = any(self.tag_active_states.get(t, True) for t in tags)
                 layer_prop = any(self.tag_propagation_states.get(t, True) for t in tags)
@@ -73,13 +80,13 @@ class ManageMixin:
 
                     prop_display = "✅" if is_prop else "❌"
                     count = tag_counts.get(tag, 0)
-                    tid = tree.insert(layer_iid, tk.END, text=tag,
-                                      values=(vis_display, count, act_display, prop_display))
-
                     color = self.get_color_for_tag(tag)
-                    try: tree.tag_configure(tid, background=color)
-                    except: pass
-                    tree.item(tid, tags=(tid,))
+                    if configured_colors.get(tag) != color:
+                        try: tree.tag_configure(tag, background=color)
+                        except tk.TclError: pass
+                        configured_colors[tag] = color
+                    tree.insert(layer_iid, tk.END, text=tag, tags=(tag,),
+                                values=(vis_display, count, act_display, prop_display))
 
         refresh_tree()
 
@@ -97,6 +104,7 @@ class ManageMixin:
                     current_vis = any(self.tag_visible_states.get(t, True) for t in self.tag_hierarchy[item_text])
                     for t in self.tag_hierarchy[item_text]: self.tag_visible_states[t] = not current_vis
                 else: self.tag_visible_states[item_text] = not self.tag_visible_states.get(item_text, True)
+                self.apply_annotations_to_text()
             elif column == '#3':
                 if is_layer:
                     current_active = any(self.tag_active_states.get(t, True) for t in self.tag_hierarchy[item_text])
@@ -108,9 +116,9 @@ class ManageMixin:
                     for t in self.tag_hierarchy[item_text]: self.tag_propagation_states[t] = not current_prop
                 else: self.tag_propagation_states[item_text] = not self.tag_propagation_states.get(item_text, True)
 
+            self._dirty = True
             refresh_tree()
             self._update_entity_tag_combobox()
-            self.apply_annotations_to_text()
 
         tree.bind("<Double-1>", on_tree_double_click)
 
@@ -142,6 +150,8 @@ class ManageMixin:
             self.tag_propagation_states[tag] = True
             self.tag_visible_states[tag] = True
             self._sync_flat_tags()
+            self._dirty = True
+            pending['configure'] = True
             refresh_tree()
             self._update_entity_tag_combobox()
             new_tag_var.set("")
@@ -184,6 +194,10 @@ class ManageMixin:
                         if entity.get("tag") == old_tag:
                             entity["tag"] = new_tag
                             rename_count += 1
+                if rename_count:
+                    tag_counts[new_tag] = tag_counts.get(new_tag, 0) + tag_counts.pop(old_tag, 0)
+                    pending['entities'] = True
+                self._invalidate_entity_caches()
                 if self.current_file_path: self._build_entity_lookup_map(self.annotations.get(self.current_file_path, {}).get('entities', []))
                 messagebox.showinfo("Merge Successful", f"Successfully merged '{old_tag}' into '{new_tag}'.\nUpdated {rename_count} annotations.", parent=window)
             else:
@@ -201,9 +215,17 @@ class ManageMixin:
                         if entity.get("tag") == old_tag:
                             entity["tag"] = new_tag
                             rename_count += 1
+                if rename_count:
+                    tag_counts[new_tag] = tag_counts.get(new_tag, 0) + tag_counts.pop(old_tag, 0)
+                    pending['entities'] = True
+                self._invalidate_entity_caches()
                 if self.current_file_path: self._build_entity_lookup_map(self.annotations.get(self.current_file_path, {}).get('entities', []))
                 messagebox.showinfo("Rename Successful", f"Renamed to '{new_tag}'.\nUpdated {rename_count} annotations.", parent=window)
+                pending['configure'] = True
 
+            removed_tags.add(old_tag)
+            self._dirty = True
+            pending['highlight'] = True
             refresh_tree()
             self._update_entity_tag_combobox()
 
@@ -229,6 +251,8 @@ class ManageMixin:
             self.tag_visible_states.pop(tag, None)
             self.tag_colors.pop(tag, None)
             self._sync_flat_tags()
+            removed_tags.add(tag)
+            self._dirty = True
             self._update_entity_tag_combobox()
             refresh_tree()
 
@@ -252,6 +276,7 @@ class ManageMixin:
                                        parent=window)
                 return
             self.tag_hierarchy[name] = []
+            self._dirty = True
             refresh_tree()
 
         def rename_layer():
@@ -283,6 +308,7 @@ class ManageMixin:
                                        parent=window)
                 return
             self.tag_hierarchy[new_name] = self.tag_hierarchy.pop(old_name)
+            self._dirty = True
             refresh_tree()
 
         def delete_layer():
@@ -319,6 +345,8 @@ class ManageMixin:
 
             del self.tag_hierarchy[layer_name]
             self._sync_flat_tags()
+            removed_tags.update(tags)
+            self._dirty = True
             self._update_entity_tag_combobox()
             refresh_tree()
 
@@ -330,11 +358,17 @@ class ManageMixin:
                   width=10).pack(side=tk.LEFT, padx=(5, 0))
 
         def save_and_close():
-            self._configure_text_tags()
-            if self.current_file_path:
-                self.apply_annotations_to_text()
-                self.update_entities_list()
             window.destroy()
+            # Dropping the text tags of removed names clears their highlights in one call;
+            # apply_annotations_to_text only manages tags that are still defined.
+            stale_tags = removed_tags - set(self.entity_tags)
+            if stale_tags:
+                try: self.text_area.tag_delete(*stale_tags)
+                except tk.TclError: pass
+            if pending['configure']: self._configure_text_tags()
+            # The document-wide refreshes run on the next idle tick, after the dialog is gone.
+            if self.current_file_path and (pending['highlight'] or pending['entities']):
+                self._schedule_refresh(entities=pending['entities'], highlight=pending['highlight'])
 
         tk.Button(btn_frame, text="Close", command=save_and_close, width=10).pack(side=tk.RIGHT)
         window.wait_window()
@@ -357,6 +391,10 @@ class ManageMixin:
                 hotkey_num = (index + 1) % 10 if (index + 1) % 10 != 0 else 0
                 display_text = f"{hotkey_num}: {item}"
             listbox.insert(tk.END, display_text)
+        # Python-side mirror of the listbox rows (plus lower-cased sort keys for bisect),
+        # so edits never read the rows back from Tcl.
+        items_mirror = list(current_items_list)
+        sort_keys = [item.lower() for item in current_items_list]
         listbox.pack(fill=tk.BOTH, expand=True); scrollbar.config(command=listbox.yview)
         controls_frame = tk.Frame(window); controls_frame.pack(fill=tk.X, padx=10, pady=5)
         item_var = tk.StringVar()
@@ -366,13 +404,12 @@ class ManageMixin:
         def add_item():
             item = item_var.get().strip()
             if item:
-                raw_items = list(listbox.get(0, tk.END))
-                existing = [re.sub(r"^\d:\s", "", i).lower() for i in raw_items]
-                if item.lower() not in existing:
-                    listbox.insert(tk.END, item)
-                    updated_items = list(listbox.get(0, tk.END))
-                    listbox.delete(0, tk.END)
-                    for i_val in sorted(updated_items, key=str.lower): listbox.insert(tk.END, i_val)
+                key = item.lower()
+                index = bisect_left(sort_keys, key)
+                if index == len(sort_keys) or sort_keys[index] != key:
+                    sort_keys.insert(index, key)
+                    items_mirror.insert(index, item)
+                    listbox.insert(index, item)
                     item_var.set("")
                 else: messagebox.showwarning("Duplicate", f"'{item}' already exists.", parent=window)
             item_entry.focus_set()
@@ -381,15 +418,26 @@ class ManageMixin:
         def remove_item():
             indices = listbox.curselection()
             if indices:
-                for index in sorted(indices, reverse=True): listbox.delete(index)
+                # Delete runs of consecutive rows with one range call each, last run first.
+                runs = []
+                for index in sorted(indices):
+                    if runs and runs[-1][1] == index - 1: runs[-1][1] = index
+                    else: runs.append([index, index])
+                for first, last in reversed(runs):
+                    listbox.delete(first, last)
+                    del sort_keys[first:last + 1]
+                    del items_mirror[first:last + 1]
             else: messagebox.showwarning("No Selection", "Select item(s) to remove.", parent=window)
         tk.Button(controls_frame, text="Remove", width=7, command=remove_item).grid(row=0, column=2)
         button_frame = tk.Frame(window); button_frame.pack(fill=tk.X, padx=10, pady=(5, 10))
         def save_changes():
-            new_items_raw = list(listbox.get(0, tk.END))
-            new_items = new_items_raw if item_type_name != "Entity Tags" else [re.sub(r"^\d:\s*", "", item) for item in new_items_raw]
+            if items_mirror == current_items_list:
+                window.destroy()
+                return
+            new_items = list(items_mirror)
             if set(new_items) != set(current_items_list):
                 current_items_list[:] = new_items
+                self._dirty = True
                 update_combobox_func()
                 if item_type_name == "Relation Types": self.update_relations_list()
             window.destroy()
@@ -5,12 +5,57 @@ from tkinter import messagebox
 import uuid
 import re
 import os
+import threading
+import traceback
+from bisect import bisect_right
+from functools import lru_cache
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# re.IGNORECASE treats dotted and dotless i as plain 'i'; fold them first so that
+# a casefolded substring test never rules out a term the regex would match.
+_FOLD_TABLE = str.maketrans({'\u0130': 'i', '\u0131': 'i'})
+
+def _fold(text):
+    return text.translate(_FOLD_TABLE).casefold()
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+@lru_cache(maxsize=4096)
+def _compile_term(text):
+    """(regex, prefilter key, multi-token flag) for one propagation term."""
+    # Only use word boundary (\b) when the adjacent character is a
+    # word character (\w).  The trailing \b would NEVER match when
+    # the search text ends with punctuation, parentheses, or other
+    # non-alphanumeric characters (e.g. "Ego Iohannes notarius
+    # interfui. (S)").
+    #
+    # Multi-word formulae use \s+ between tokens so that line breaks,
+    # tabs, or multiple spaces in the target text do not prevent a
+    # match (e.g. vocabulary "iussu predicti iudicis" matches
+    # "iussu\npredicti iudicis" in the file).
+    pattern = ''
+    if text and text[0].isalnum():
+        pattern += r'\b'
+    tokens = text.split()
+    if len(tokens) == 1:
+        pattern += re.escape(text)
+    else:
+        pattern += r'\s+'.join(re.escape(t) for t in tokens)
+    if text and text[-1].isalnum():
+        pattern += r'\b'
+    # Every match contains the longest token literally (up to case), so the
+    # folded token serves as a cheap prefilter key for the whole pattern.
+    return re.compile(pattern, re.IGNORECASE), _fold(max(tokens, key=len)), len(tokens) > 1
 
 class PropagationMixin:
     """Dictionary propagation of annotations."""
 
     def propagate_annotations(self):
-        if not self.current_file_path: return
+        if not self.current_file_path or self._is_propagating: return
         source_entities = self.annotations.get(self.current_file_path, {}).get("entities", [])
         if not source_entities: return
         allowed_tags = {tag for tag, allowed in self.tag_propagation_states.items() if allowed}
@@ -62,7 +107,7 @@ class PropagationMixin:
         all_btn.focus_set()
 
     def load_and_propagate_from_dictionary(self):
-        if not self.files_list: return
+        if not self.files_list or self._is_propagating: return
         dict_path = filedialog.askopenfilename(title="Select Dictionary File", filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
         if not dict_path: return
         dictionary_mapping = {}
@@ -70,12 +115,15 @@ class PropagationMixin:
         try:
             with open(dict_path, 'r', encoding='utf-8') as f:
                 for line in f:
-                    if line.strip() and not line.startswith('#'):
-                        parts = line.strip().rsplit(None, 1)
-                        if len(parts) == 2:
-                            term, tag = parts[0].strip(), parts[1].strip()
-                            dictionary_mapping[term] = tag
-                            if tag not in self.entity_tags: missing_tags.add(tag)
+                    if line.startswith('#'): continue
+                    line = line.strip()
+                    if not line: continue
+                    term, sep, tag = line.rpartition('\t')
+                    if not sep: term, sep, tag = line.rpartition(' ')
+                    term, tag = term.strip(), tag.strip()
+                    if not term or not tag: continue
+                    dictionary_mapping[term] = tag
+                    if tag not in self.entity_tags: missing_tags.add(tag)
         except Exception as e:
             messagebox.showerror("Dict Read Error", f"Failed to read dictionary:\n{e}", parent=self.root)
             return
@@ -145,75 +193,133 @@ class PropagationMixin:
         tk.Button(btn_frame_bottom, text="Cancel", command=dialog.destroy, width=8).pack(side=tk.RIGHT)
 
     def _perform_propagation(self, text_to_tag_map, source_description, target_files=None):
+        if self._is_propagating: return
         if target_files is None:
             target_files = self.files_list
 
-        propagated_count, affected_files = 0, set()
         allow_overlap = True if "Dictionary" in source_description else self.allow_multilabel_overlap.get()
-        self.status_var.set(f"Starting {source_description}..."); self.root.update()
-        file_contents = {}
+        target_files = list(target_files)
+        # The scan runs on a worker thread and only reads these lists; edits made in
+        # the meantime are caught by the version check in _apply_propagation_results.
+        existing_entities = {fp: self.annotations.get(fp, {}).get("entities", []) for fp in target_files}
+        versions = {fp: self._entities_version.get(fp, 0) for fp in target_files}
+        annotations = self.annotations
+
+        self._is_propagating = True
+        self._update_button_states()
+        self.status_var.set(f"Starting {source_description}...")
+        self.progress_bar.start()
 
-        for file_path in target_files:
+        def thread_target():
             try:
-                with open(file_path, 'r', encoding='utf-8') as f: file_contents[file_path] = f.read()
-            except Exception: continue
+                results = self._scan_files_for_propagation(text_to_tag_map, target_files, existing_entities, allow_overlap, source_description)
+            except Exception as e:
+                traceback.print_exc()
+                self._update_status_threadsafe(f"DONE|{source_description} failed: {e}")
+                self.root.after(0, self._end_propagation)
+                return
+            self.root.after(0, self._apply_propagation_results, annotations, versions, results, allow_overlap, source_description)
 
+        threading.Thread(target=thread_target, daemon=True).start()
+
+    def _get_propagation_patterns(self, text_to_tag_map):
+        """(patterns sorted longest-first, prefilter keys, automaton or None), reused while the mapping is unchanged."""
+        cache_key = tuple(text_to_tag_map.items())
+        cached = self._propagation_patterns_cache
+        if cached is not None and cached[0] == cache_key: return cached[1:]
         compiled_regexes = []
         for text, tag in text_to_tag_map.items():
-            # Only use word boundary (\b) when the adjacent character is a
-            # word character (\w).  The trailing \b would NEVER match when
-            # the search text ends with punctuation, parentheses, or other
-            # non-alphanumeric characters (e.g. "Ego Iohannes notarius
-            # interfui. (S)").
-            #
-            # Multi-word formulae use \s+ between tokens so that line breaks,
-            # tabs, or multiple spaces in the target text do not prevent a
-            # match (e.g. vocabulary "iussu predicti iudicis" matches
-            # "iussu\npredicti iudicis" in the file).
-            pattern = ''
-            if text and text[0].isalnum():
-                pattern += r'\b'
-            tokens = text.split()
-            if len(tokens) == 1:
-                pattern += re.escape(text)
-            else:
-                pattern += r'\s+'.join(re.escape(t) for t in tokens)
-            if text and text[-1].isalnum():
-                pattern += r'\b'
-            compiled_regexes.append((re.compile(pattern, re.IGNORECASE), tag, text))
+            regex, prefilter_key, multi_token = _compile_term(text)
+            compiled_regexes.append((regex, tag, text, prefilter_key, multi_token))
         compiled_regexes.sort(key=lambda x: len(x[2]), reverse=True)
 
-        for file_path, content in file_contents.items():
-            target_entities = self.annotations.setdefault(file_path, {"entities": [], "relations": []})['entities']
+        prefilter_keys = {key for _, _, _, key, _ in compiled_regexes}
+        automaton = None
+        if ahocorasick is not None and prefilter_keys:
+            automaton = ahocorasick.Automaton()
+            for key in prefilter_keys: automaton.add_word(key, key)
+            automaton.make_automaton()
+        self._propagation_patterns_cache = (cache_key, compiled_regexes, prefilter_keys, automaton)
+        return compiled_regexes, prefilter_keys, automaton
+
+    def _scan_files_for_propagation(self, text_to_tag_map, target_files, existing_entities, allow_overlap, source_description):
+        """Worker-thread part of propagation: returns {file_path: [new entities]} without touching the UI."""
+        compiled_regexes, prefilter_keys, automaton = self._get_propagation_patterns(text_to_tag_map)
+
+        results = {}
+        for file_num, file_path in enumerate(target_files, 1):
+            if file_num % 50 == 0:
+                self._update_status_threadsafe(f"{source_description}: scanned {file_num}/{len(target_files)} files...")
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f: content = f.read()
+            except Exception: continue
+            target_entities = existing_entities.get(file_path, [])
+            folded_content = _fold(content)
+            if automaton is not None: present_keys = {key for _, key in automaton.iter(folded_content)}
+            else: present_keys = {key for key in prefilter_keys if key in folded_content}
+            if not present_keys: continue
             existing_spans_and_tags = {(ann['start_line'], ann['start_char'], ann['end_line'], ann['end_char'], ann['tag']) for ann in target_entities}
-            line_starts = [0]
-            for i, char in enumerate(content):
-                if char == '\n': line_starts.append(i + 1)
-            line_starts.append(len(content) + 1)
+            overlap_index = None if allow_overlap else self._build_overlap_index(target_entities)
+            line_starts = self._compute_line_starts(content)
 
-            for regex, tag, matched_text_original in compiled_regexes:
+            for regex, tag, matched_text_original, prefilter_key, multi_token in compiled_regexes:
+                if prefilter_key not in present_keys: continue
                 for match in regex.finditer(content):
-                    matched_text = re.sub(r'\s+', ' ', match.group()).strip()
+                    # Single-token patterns cannot match whitespace, so only multi-token
+                    # matches need their line breaks and runs of spaces collapsed.
+                    matched_text = _WHITESPACE_RE.sub(' ', match.group()).strip() if multi_token else match.group()
                     start_index, end_index = match.span()
-                    start_pos = self._char_offset_to_tkinter_index_from_offsets(line_starts, start_index)
-                    end_pos = self._char_offset_to_tkinter_index_from_offsets(line_starts, end_index)
-                    start_l, start_c = map(int, start_pos.split('.'))
-                    end_l, end_c = map(int, end_pos.split('.'))
+                    start_line_idx = bisect_right(line_starts, start_index) - 1
+                    end_line_idx = bisect_right(line_starts, end_index) - 1
+                    start_l, start_c = start_line_idx + 1, start_index - line_starts[start_line_idx]
+                    end_l, end_c = end_line_idx + 1, end_index - line_starts[end_line_idx]
                     current_span_and_tag = (start_l, start_c, end_l, end_c, tag)
 
                     if current_span_and_tag in existing_spans_and_tags: continue
-                    if not allow_overlap and self._is_overlapping_in_list(start_l, start_c, end_l, end_c, target_entities): continue
+                    if overlap_index and self._overlaps_index(overlap_index, (start_l, start_c), (end_l, end_c)): continue
 
                     new_ann = {'id': uuid.uuid4().hex, 'start_line': start_l, 'start_char': start_c,
                                'end_line': end_l, 'end_char': end_c, 'text': matched_text, 'tag': tag, 'propagated': True}
-                    target_entities.append(new_ann)
+                    results.setdefault(file_path, []).append(new_ann)
                     existing_spans_and_tags.add(current_span_and_tag)
-                    propagated_count += 1
-                    affected_files.add(file_path)
+                    if overlap_index: self._add_to_overlap_index(overlap_index, (start_l, start_c), (end_l, end_c))
+        return results
+
+    def _end_propagation(self):
+        self._is_propagating = False
+        self._update_button_states()
 
+    def _apply_propagation_results(self, annotations, versions, results, allow_overlap, source_description):
+        self._is_propagating = False
+        if annotations is not self.annotations:
+            self._update_status_threadsafe(f"DONE|{source_description} discarded: the session changed while it was running.")
+            self._update_button_states()
+            return
+
+        propagated_count, affected_files = 0, set()
+        for file_path, new_anns in results.items():
+            target_entities = self.annotations.setdefault(file_path, {"entities": [], "relations": []})['entities']
+            if self._entities_version.get(file_path, 0) != versions.get(file_path, 0):
+                # The file was edited during the scan; drop matches that now clash.
+                existing_spans_and_tags = {(ann['start_line'], ann['start_char'], ann['end_line'], ann['end_char'], ann['tag']) for ann in target_entities}
+                overlap_index = None if allow_overlap else self._build_overlap_index(target_entities)
+                kept = []
+                for ann in new_anns:
+                    start, end = (ann['start_line'], ann['start_char']), (ann['end_line'], ann['end_char'])
+                    if start + end + (ann['tag'],) in existing_spans_and_tags: continue
+                    if overlap_index and self._overlaps_index(overlap_index, start, end): continue
+                    kept.append(ann)
+                    if overlap_index: self._add_to_overlap_index(overlap_index, start, end)
+                new_anns = kept
+            if not new_anns: continue
+            target_entities.extend(new_anns)
+            propagated_count += len(new_anns)
+            affected_files.add(file_path)
+
+        for file_path in affected_files: self._invalidate_entity_caches(file_path)
         if self.current_file_path in affected_files:
             self._build_entity_lookup_map(self.annotations.get(self.current_file_path, {})['entities'])
             self.update_entities_list()
             self.apply_annotations_to_text()
         self._update_button_states()
-        self.status_var.set(f"{source_description} complete. Added {propagated_count} entities across {len(affected_files)} files.")
+        self._update_status_threadsafe(f"DONE|{source_description} complete. Added {propagated_count} entities across {len(affected_files)} files.")
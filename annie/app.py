@@ -45,10 +45,20 @@ class TextAnnotator(
         self.current_file_index = -1
         self.annotations = {}
         self.session_save_path = None
+        self._dirty = False
 
         # --- Optimized Data Structures ---
         self.line_start_offsets = [0]
         self._entity_lookup_map = {}
+        self._entity_lookup_maps = {}
+        self._entities_version = {}
+        self._entity_display_map_cache = {}
+        self._relation_index_cache = {}
+        self._sorted_entities_cache = {}
+        self._file_path_to_index = None
+        self._text_load_generation = 0
+        self._text_loading = False
+        self._pending_search_term = None
 
         # --- Entity Tagging Configuration (Hierarchical) ---
         self.tag_hierarchy = {
@@ -70,14 +80,27 @@ class TextAnnotator(
         self.relation_types = ["spouse_of", "works_at", "located_in", "born_on", "produces"]
         self.selected_relation_type = tk.StringVar(value=self.relation_types[0] if self.relation_types else "")
         self.selection_mode = tk.StringVar(value="word")
+        # These options are saved with the session; toggling one from the menus or the
+        # checkbox is an unsaved change.
+        for var in (self.extend_to_word, self.allow_multilabel_overlap, self.selection_mode):
+            var.trace_add("write", self._mark_dirty)
 
         # --- UI State ---
-        self.selected_entity_ids_for_relation = []
+        self.selected_entity_ids_for_relation = set()
         self._entity_id_to_tree_iids = {}
+        self._iid_to_values = {}
+        self._relation_iid_to_values = {}
         self._click_time = 0
         self._click_pos = (0, 0)
         self._is_deleting = False
+        self._entities_tree_rebuilding = False
+        self._pending_refresh = {'entities': False, 'relations': False, 'highlight': False}
+        self._pending_selection_hint = None
+        self._refresh_scheduled = False
+        self._button_state_pending = False
         self._is_annotating_ai = False
+        self._is_propagating = False
+        self._propagation_patterns_cache = None
         self._just_double_clicked = False
         self.last_used_ai_models = []
         self.current_ai_models = []
@@ -130,7 +153,8 @@ class TextAnnotator(
         self.progress_bar.pack(side=tk.RIGHT, padx=5, pady=2, fill=tk.X, expand=False)
         self.progress_bar.stop()
         self.ai_status_queue = queue.Queue()
-        self._process_queue()
+        self.root.bind('<<AIStatus>>', self._process_queue)
+        self._poll_ai_queue()
 
         # --- Build UI ---
         self.create_menu()
@@ -157,7 +181,7 @@ def main():
     root = tk.Tk()
     try:
         style = ttk.Style()
-        themes = style.theme_names()
+        themes = set(style.theme_names())
         preferred_themes = ['clam', 'alt', 'vista', 'xpnative']
         current_theme = style.theme_use()
         if current_theme not in preferred_themes:
@@ -2,3 +2,6 @@
 """Shared constants."""
 
 SESSION_FILE_VERSION = "1.14"
+
+# (line, char) packed as line * POSITION_STRIDE + char: one int compare instead of a tuple.
+POSITION_STRIDE = 1 << 32
@@ -1,6 +1,34 @@
 # -*- coding: utf-8 -*-
 import tkinter as tk
+import re
+import sys
 from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from functools import lru_cache
+from annie.constants import POSITION_STRIDE
+
+@lru_cache(maxsize=4096)
+def compile_word_pattern(term):
+    """Case-insensitive whole-word regex for a literal term, compiled once per term."""
+    return re.compile(r'\b' + re.escape(term) + r'\b', re.IGNORECASE)
+
+@lru_cache(maxsize=1024)
+def parse_text_index(index):
+    """'line.char' -> (line, char); repeated clicks and tree iids hit the cache."""
+    line, char = index.split('.', 1)
+    return int(line), int(char)
+
+def compute_line_starts(text):
+    """Offsets of every line start plus a len+1 sentinel."""
+    # str.find instead of a per-character Python loop.
+    line_starts = [0]
+    find = text.find
+    pos = find('\n')
+    while pos != -1:
+        line_starts.append(pos + 1)
+        pos = find('\n', pos + 1)
+    line_starts.append(len(text) + 1)
+    return line_starts
 
 class CoreMixin:
     """Pure, widget-free helpers shared across sections."""
@@ -64,7 +92,16 @@ class CoreMixin:
 
     def _sync_flat_tags(self):
         """Synchronizes the flat entity_tags list with the current hierarchy."""
-        self.entity_tags = [tag for tags in self.tag_hierarchy.values() for tag in tags]
+        self.entity_tags = [sys.intern(tag) for tags in self.tag_hierarchy.values() for tag in tags]
+
+    def _intern_entity_tags(self, annotations):
+        # JSON decoding gives every entity its own copy of the tag string; interning
+        # shares one object per tag and lets tag comparisons short-circuit on identity.
+        intern = sys.intern
+        for data in annotations.values():
+            for entity in data.get("entities", []):
+                tag = entity.get('tag')
+                if isinstance(tag, str): entity['tag'] = intern(tag)
 
     def get_active_tags(self):
         """Returns a flat list of currently ACTIVE tags in hierarchical order."""
@@ -80,6 +117,8 @@ class CoreMixin:
             self.get_color_for_tag(tag)
 
     def get_color_for_tag(self, tag):
+        color = self.tag_colors.get(tag)
+        if color is not None: return color
         if tag not in self.tag_colors:
             try:
                 if tag in self.entity_tags: self.tag_colors[tag] = next(self.color_cycle)
@@ -94,6 +133,12 @@ class CoreMixin:
         self.files_listbox.delete(0, tk.END)
         self.current_file_index = -1
         self.annotations = {}
+        self._entities_version.clear()
+        self._entity_display_map_cache.clear()
+        self._relation_index_cache.clear()
+        self._sorted_entities_cache.clear()
+        self._entity_lookup_maps.clear()
+        self._dirty = False
         self.session_save_path = None
         self.root.title("ANNIE - Annotation Interface")
         self.status_var.set("Ready. Open a directory or load a session.")
@@ -101,48 +146,194 @@ class CoreMixin:
         self.last_used_ai_models = []
         self.current_ai_models = []
 
+    def _mark_dirty(self, *args):
+        self._dirty = True
+
+    def _invalidate_entity_caches(self, file_path=None):
+        file_paths = [file_path] if file_path is not None else list(self.annotations)
+        for fp in file_paths:
+            self._entities_version[fp] = self._entities_version.get(fp, 0) + 1
+        self._dirty = True  # every entity edit passes through here
+
+    def _get_relation_index(self, file_path):
+        # (id -> relation, {(head, tail, type)}) for a file. Rebuilt whenever the
+        # relations list itself is replaced; in-place edits keep it up to date.
+        relations = self.annotations.get(file_path, {}).get("relations", [])
+        index = self._relation_index_cache.get(file_path)
+        if index is None or index[0] is not relations:
+            index = (relations, {r['id']: r for r in relations}, {(r['head_id'], r['tail_id'], r['type']) for r in relations})
+            self._relation_index_cache[file_path] = index
+        return index[1], index[2]
+
+    def _file_index(self, file_path):
+        # Row of file_path in files_list (None if absent). Rebuilt when files_list is
+        # replaced; in-place changes to it must reset _file_path_to_index.
+        index = self._file_path_to_index
+        if index is None or index[0] is not self.files_list:
+            index = (self.files_list, {p: i for i, p in enumerate(self.files_list)})
+            self._file_path_to_index = index
+        return index[1].get(file_path)
+
+    def _get_sorted_entities(self, file_path):
+        # (packed starts, packed ends, running max of ends, entities) sorted by start for
+        # bisecting click positions. Reused until the entity list is replaced or its
+        # version is bumped.
+        entities = self.annotations.get(file_path, {}).get("entities", [])
+        version = self._entities_version.get(file_path, 0)
+        cached = self._sorted_entities_cache.get(file_path)
+        if cached is None or cached[0] is not entities or cached[1] != version:
+            keyed = sorted((e['start_line'] * POSITION_STRIDE + e['start_char'], i) for i, e in enumerate(entities))
+            sorted_entities = [entities[i] for _, i in keyed]
+            start_keys = [key for key, _ in keyed]
+            end_keys = [e['end_line'] * POSITION_STRIDE + e['end_char'] for e in sorted_entities]
+            max_end_keys = list(accumulate(end_keys, max))
+            cached = (entities, version, start_keys, end_keys, max_end_keys, sorted_entities)
+            self._sorted_entities_cache[file_path] = cached
+        return cached[2:]
+
+    def _find_entity_at(self, file_path, line, char):
+        """Innermost (shortest) entity covering (line, char), or None."""
+        start_keys, end_keys, max_end_keys, sorted_entities = self._get_sorted_entities(file_path)
+        key = line * POSITION_STRIDE + char
+        best, best_span = None, None
+        # Walk back from the last entity starting at or before the position; once no
+        # earlier entity reaches past it (running max of ends), nothing else can cover it.
+        i = bisect_right(start_keys, key) - 1
+        while i >= 0 and max_end_keys[i] > key:
+            if end_keys[i] > key:
+                span = end_keys[i] - start_keys[i]
+                if best_span is None or span < best_span: best, best_span = sorted_entities[i], span
+            i -= 1
+        return best
+
     def _build_entity_lookup_map(self, entities):
-        self._entity_lookup_map.clear()
+        # id -> entity dicts of the current file; merged entities share an id.
+        lookup_map = {}
         for entity in entities:
-            key = (entity['id'], entity['start_line'], entity['start_char'],
-                   entity['end_line'], entity['end_char'], entity['tag'])
-            self._entity_lookup_map[key] = entity
-
-    def _tkinter_index_to_char_offset(self, text, line, char):
-        lines = text.split('\n')
-        offset = sum(len(l) + 1 for l in lines[:line - 1])
-        offset += char
-        return offset
-
-    def _char_offset_to_tkinter_index(self, text, offset):
-        if not self.line_start_offsets or offset < 0 or offset >= self.line_start_offsets[-1]:
-            line_start = text.rfind('\n', 0, offset) + 1
-            line = text.count('\n', 0, offset) + 1
-            char = offset - line_start
-            return f"{line}.{char}"
-
-        line_idx = bisect_right(self.line_start_offsets, offset) - 1
-        line = line_idx + 1
-        char = offset - self.line_start_offsets[line_idx]
-        return f"{line}.{char}"
-
-    def _char_offset_to_tkinter_index_from_offsets(self, line_offsets, offset):
+            lookup_map.setdefault(entity['id'], []).append(entity)
+        self._entity_lookup_map = lookup_map
+
+    def _stash_entity_lookup_map(self):
+        # Edits keep the current file's map up to date, so it stays valid for a revisit
+        # as long as nothing else bumps that file's entity version meanwhile.
+        file_path = self.current_file_path
+        if file_path in self.annotations:
+            entities = self.annotations[file_path].get("entities", [])
+            self._entity_lookup_maps[file_path] = (entities, self._entities_version.get(file_path, 0), self._entity_lookup_map)
+
+    def _load_entity_lookup_map(self, file_path):
+        entities = self.annotations.get(file_path, {}).get("entities", [])
+        cached = self._entity_lookup_maps.get(file_path)
+        if cached and cached[0] is entities and cached[1] == self._entities_version.get(file_path, 0):
+            self._entity_lookup_map = cached[2]
+        else: self._build_entity_lookup_map(entities)
+
+    def _lookup_entity_from_iid(self, iid):
+        # Entity tree iids are "entity|id|start|end|tag|n". The id alone settles it unless
+        # it is merged; then the span and tag pick the right instance.
+        parts = iid.split('|')
+        if len(parts) < 6: return None
+        instances = self._entity_lookup_map.get(parts[1])
+        if not instances: return None
+        if len(instances) == 1: return instances[0]
+        try:
+            start_line, start_char = parse_text_index(parts[2])
+            end_line, end_char = parse_text_index(parts[3])
+        except ValueError: return None
+        tag = parts[4]
+        for entity in instances:
+            if (entity['start_line'] == start_line and entity['start_char'] == start_char and
+                    entity['end_line'] == end_line and entity['end_char'] == end_char and entity['tag'] == tag):
+                return entity
+        return None
+
+    def _compute_line_starts(self, text):
+        return compute_line_starts(text)
+
+    def _char_offset_to_lc(self, line_offsets, offset):
+        """Character offset -> (line, char) against a _compute_line_starts table."""
         line_idx = bisect_right(line_offsets, offset) - 1
-        line = line_idx + 1
-        char = offset - line_offsets[line_idx]
-        return f"{line}.{char}"
-
-    def _spans_overlap_numeric(self, start1_l, start1_c, end1_l, end1_c, start2_l, start2_c, end2_l, end2_c):
-        span1_start, span1_end = (start1_l, start1_c), (end1_l, end1_c)
-        span2_start, span2_end = (start2_l, start2_c), (end2_l, end2_c)
-        return not ((span1_end <= span2_start) or (span1_start >= span2_end))
-
-    def _is_overlapping_in_list(self, start_l, start_c, end_l, end_c, entities_list):
-        for ann in entities_list:
-            if self._spans_overlap_numeric(start_l, start_c, end_l, end_c, ann['start_line'], ann['start_char'], ann['end_line'], ann['end_char']): return True
+        return line_idx + 1, offset - line_offsets[line_idx]
+
+    def _offsets_to_line_chars(self, line_offsets, offsets):
+        """{offset: (line, char)} for many offsets in one merge walk over the sorted offsets."""
+        # Like a cursor over both sorted sequences: the line index only ever moves forward,
+        # so K offsets over L lines cost O(K log K + L) instead of a bisect per offset.
+        result = {}
+        line_idx, last_idx = 0, len(line_offsets) - 1
+        for offset in sorted(set(offsets)):
+            while line_idx < last_idx and line_offsets[line_idx + 1] <= offset: line_idx += 1
+            result[offset] = (line_idx + 1, offset - line_offsets[line_idx])
+        return result
+
+    def _tkinter_index_to_char_offset_from_offsets(self, line_offsets, line, char):
+        # line_offsets comes from _compute_line_starts; lines past the end resolve to
+        # the len+1 sentinel.
+        return line_offsets[min(line - 1, len(line_offsets) - 1)] + char
+
+    def _overlaps_entities(self, file_path, start_l, start_c, end_l, end_c):
+        # Entities starting before the span's end overlap it exactly when the furthest of
+        # their ends (the running max) passes the span's start.
+        start_keys, _, max_end_keys, _ = self._get_sorted_entities(file_path)
+        i = bisect_left(start_keys, end_l * POSITION_STRIDE + end_c) - 1
+        return i >= 0 and max_end_keys[i] > start_l * POSITION_STRIDE + start_c
+
+    def _has_exact_entity(self, file_path, start_l, start_c, end_l, end_c, tag):
+        start_keys, end_keys, _, sorted_entities = self._get_sorted_entities(file_path)
+        start_key, end_key = start_l * POSITION_STRIDE + start_c, end_l * POSITION_STRIDE + end_c
+        i, n = bisect_left(start_keys, start_key), len(start_keys)
+        while i < n and start_keys[i] == start_key:
+            if end_keys[i] == end_key and sorted_entities[i]['tag'] == tag: return True
+            i += 1
         return False
 
+    def _build_overlap_index(self, entities):
+        # Merge the spans into disjoint runs sorted by start; a span overlaps one of
+        # the entities exactly when it overlaps one of these runs. An empty span only
+        # overlaps what strictly contains it, so it is kept as its own run unless it
+        # touches a non-empty one, which already blocks everything it would.
+        starts, ends = [], []
+        for start, end in sorted(((e['start_line'], e['start_char']), (e['end_line'], e['end_char'])) for e in entities):
+            if ends and (start < ends[-1] or start == starts[-1] == ends[-1]):
+                if end > ends[-1]: ends[-1] = end
+            elif ends and start == end == ends[-1]:
+                continue
+            else:
+                starts.append(start)
+                ends.append(end)
+        return starts, ends
+
+    def _overlaps_index(self, overlap_index, start, end):
+        starts, ends = overlap_index
+        i = bisect_left(starts, end) - 1
+        return i >= 0 and ends[i] > start
+
+    def _add_to_overlap_index(self, overlap_index, start, end):
+        # Only spans that overlap none of the runs are added, keeping the same runs
+        # _build_overlap_index would produce.
+        starts, ends = overlap_index
+        i = bisect_left(starts, start)
+        if start == end:
+            if (i < len(starts) and starts[i] == start) or (i > 0 and ends[i - 1] == start): return
+            starts.insert(i, start)
+            ends.insert(i, end)
+            return
+        if i < len(starts) and starts[i] == start:
+            ends[i] = end
+        else:
+            starts.insert(i, start)
+            ends.insert(i, end)
+        if i + 1 < len(starts) and starts[i + 1] == ends[i + 1] == end:
+            del starts[i + 1], ends[i + 1]
+
     def _add_to_entity_lookup_map(self, entity):
-        key = (entity['id'], entity['start_line'], entity['start_char'],
-               entity['end_line'], entity['end_char'], entity['tag'])
-        self._entity_lookup_map[key] = entity
+        self._entity_lookup_map.setdefault(entity['id'], []).append(entity)
+
+    def _remove_from_entity_lookup_map(self, entity):
+        instances = self._entity_lookup_map.get(entity['id'])
+        if instances:
+            for i, inst in enumerate(instances):
+                if inst is entity:
+                    del instances[i]
+                    break
+            if not instances: del self._entity_lookup_map[entity['id']]
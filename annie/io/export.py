@@ -6,6 +6,17 @@ import json
 import re
 import traceback
 import os
+from bisect import bisect_left
+from functools import lru_cache
+from annie.core import compute_line_starts
+
+_CONLL_TOKEN_RE = re.compile(r'\w+|[^\w\s]')
+
+@lru_cache(maxsize=64)
+def _read_document(path, mtime):
+    # Keyed on mtime so an edited file is read again; repeated exports reuse the text.
+    with open(path, 'r', encoding='utf-8') as f: content = f.read()
+    return content, compute_line_starts(content)
 
 class ExportMixin:
     """Annotation / dictionary export."""
@@ -119,71 +130,74 @@ class ExportMixin:
         tk.Button(btn_frame_bottom, text="Cancel", command=dialog.destroy, width=8).pack(side=tk.RIGHT)
 
     def _export_as_spacy_jsonl(self, save_path):
-        with open(save_path, 'w', encoding='utf-8') as f:
+        with open(save_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
             for file_path, data in self.annotations.items():
                 if not data.get("entities"): continue
 
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as text_file:
-                        content = text_file.read()
+                try: content, line_starts = _read_document(file_path, os.path.getmtime(file_path))
                 except Exception:
                     continue
 
                 raw_spans = []
-                sorted_entities = sorted(data['entities'], key=lambda x: (x['start_line'], x['start_char']))
+                sorted_entities = self._get_sorted_entities(file_path)[3]
+                to_offset = self._tkinter_index_to_char_offset_from_offsets
 
                 for ann in sorted_entities:
-                    start_char = self._tkinter_index_to_char_offset(content, ann['start_line'], ann['start_char'])
-                    end_char = self._tkinter_index_to_char_offset(content, ann['end_line'], ann['end_char'])
+                    start_char = to_offset(line_starts, ann['start_line'], ann['start_char'])
+                    end_char = to_offset(line_starts, ann['end_line'], ann['end_char'])
                     raw_spans.append({"start": start_char, "end": end_char, "label": ann['tag']})
 
                 normalized_text, remapped_spans = self._normalize_and_remap(content, raw_spans)
 
-                spacy_doc = {"text": normalized_text, "spans": remapped_spans}
-                f.write(json.dumps(spacy_doc, ensure_ascii=False) + '\n')
+                # dumps keeps the one-shot C encoder; the newline is a separate write
+                # rather than a copy of the whole document string.
+                f.write(json.dumps({"text": normalized_text, "spans": remapped_spans}, ensure_ascii=False))
+                f.write('\n')
 
     def _export_as_conll(self, save_path):
         with open(save_path, 'w', encoding='utf-8') as f:
             for file_path, data in self.annotations.items():
                 if not data.get("entities"): continue
 
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as text_file:
-                        content = text_file.read()
+                try: content, line_starts = _read_document(file_path, os.path.getmtime(file_path))
                 except Exception:
                     continue
 
                 raw_spans = []
-                sorted_entities = sorted(data['entities'], key=lambda x: (x['start_line'], x['start_char']))
+                sorted_entities = self._get_sorted_entities(file_path)[3]
+                to_offset = self._tkinter_index_to_char_offset_from_offsets
 
                 for ann in sorted_entities:
-                    start_char = self._tkinter_index_to_char_offset(content, ann['start_line'], ann['start_char'])
-                    end_char = self._tkinter_index_to_char_offset(content, ann['end_line'], ann['end_char'])
+                    start_char = to_offset(line_starts, ann['start_line'], ann['start_char'])
+                    end_char = to_offset(line_starts, ann['end_line'], ann['end_char'])
                     raw_spans.append({"start": start_char, "end": end_char, "label": ann['tag']})
 
                 normalized_text, remapped_spans = self._normalize_and_remap(content, raw_spans)
 
-                tokens = [(m.group(0), m.start()) for m in re.finditer(r'\w+|[^\w\s]', normalized_text)]
-                tags = ["O"] * len(tokens)
+                matches = list(_CONLL_TOKEN_RE.finditer(normalized_text))
+                token_texts = [m.group() for m in matches]
+                token_count = len(matches)
+                tags = ["O"] * token_count
+                # Tokens never overlap, so starts and ends are both ascending: the tokens
+                # inside a span are one run beginning at the first start >= span start.
+                token_starts = [m.start() for m in matches]
+                token_ends = [m.end() for m in matches]
 
                 for span in remapped_spans:
                     start_char_abs = span['start']
                     end_char_abs = span['end']
                     tag_name = span['label']
 
-                    is_first_token = True
-                    for i, (token_text, token_start) in enumerate(tokens):
-                        token_end = token_start + len(token_text)
-
-                        if token_start >= start_char_abs and token_end <= end_char_abs:
-                            if is_first_token:
-                                tags[i] = f"B-{tag_name}"
-                                is_first_token = False
-                            else:
-                                tags[i] = f"I-{tag_name}"
+                    i = bisect_left(token_starts, start_char_abs)
+                    if i < token_count and token_ends[i] <= end_char_abs:
+                        tags[i] = f"B-{tag_name}"
+                        i += 1
+                        inside_tag = f"I-{tag_name}"
+                        while i < token_count and token_ends[i] <= end_char_abs:
+                            tags[i] = inside_tag
+                            i += 1
 
-                for i, (token_text, _) in enumerate(tokens):
-                    f.write(f"{token_text} {tags[i]}\n")
+                f.writelines(f"{token_text} {tag}\n" for token_text, tag in zip(token_texts, tags))
                 f.write("\n")
 
     def _ask_for_save_directory(self, initial_dir):
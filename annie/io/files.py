@@ -5,6 +5,9 @@ from tkinter import messagebox
 import re
 import os
 import shutil
+from bisect import bisect_right
+
+_LOAD_CHUNK_CHARS = 1 << 18
 
 class FilesMixin:
     """Directory / file / session-file loading."""
@@ -17,17 +20,20 @@ class FilesMixin:
             new_files_list = []
             xml_converted = []
             try:
-                for filename in sorted(os.listdir(directory)):
-                    filepath = os.path.join(directory, filename)
-                    if os.path.isfile(filepath):
-                        if filename.lower().endswith(".txt"):
-                            new_files_list.append(filepath)
-                        elif filename.lower().endswith(".xml"):
-                            # Convert XML to TXT (if CEI XML)
-                            converted_path = self._convert_cei_xml_to_txt(filepath, directory)
-                            if converted_path:
-                                new_files_list.append(converted_path)
-                                xml_converted.append(filename)
+                # scandir entries carry their type, so is_file() usually needs no extra stat.
+                with os.scandir(directory) as it:
+                    entries = sorted((entry for entry in it if entry.name.lower().endswith((".txt", ".xml")) and entry.is_file()),
+                                     key=lambda entry: entry.name)
+                for entry in entries:
+                    filename, filepath = entry.name, entry.path
+                    if filename.lower().endswith(".txt"):
+                        new_files_list.append(filepath)
+                    else:
+                        # Convert XML to TXT (if CEI XML)
+                        converted_path = self._convert_cei_xml_to_txt(filepath, directory)
+                        if converted_path:
+                            new_files_list.append(converted_path)
+                            xml_converted.append(filename)
             except OSError as e:
                 messagebox.showerror("Error Loading Directory", f"Could not read directory contents:\n{e}", parent=self.root)
                 return
@@ -35,8 +41,7 @@ class FilesMixin:
                 self._reset_state()
                 self.files_list = new_files_list
                 self.files_listbox.delete(0, tk.END)
-                for file_path in self.files_list:
-                    self.files_listbox.insert(tk.END, os.path.basename(file_path))
+                self.files_listbox.insert(tk.END, *[os.path.basename(file_path) for file_path in self.files_list])
                 self.load_file(0)
                 msg = f"Loaded {len(self.files_list)} files from '{os.path.basename(directory)}'"
                 if xml_converted:
@@ -84,6 +89,7 @@ class FilesMixin:
                 continue
 
             base_name = os.path.basename(file_path).replace('.txt', '')
+            line_starts = self._compute_line_starts(content)
             sentences = []
             current_sentence_start = 0
 
@@ -120,35 +126,26 @@ class FilesMixin:
                 new_annotations[new_file_path] = {"entities": [], "relations": []}
                 sentence_entities = []
                 old_id_to_new_id = {}
+                leading_spaces = len(s_text) - len(s_text.lstrip())
+                clean_s_text = s_text.strip()
+                new_line_starts = self._compute_line_starts(clean_s_text)
 
                 for ann in file_annotations:
                     try:
-                        ann_start_abs = self._tkinter_index_to_char_offset(content, ann['start_line'], ann['start_char'])
-                        ann_end_abs = self._tkinter_index_to_char_offset(content, ann['end_line'], ann['end_char'])
+                        ann_start_abs = self._tkinter_index_to_char_offset_from_offsets(line_starts, ann['start_line'], ann['start_char'])
+                        ann_end_abs = self._tkinter_index_to_char_offset_from_offsets(line_starts, ann['end_line'], ann['end_char'])
                     except Exception as e:
                         print(f"Skipping malformed annotation {ann.get('id')}: {e}")
                         continue
 
                     if ann_start_abs >= s_start and ann_end_abs <= s_end:
-                        leading_spaces = len(s_text) - len(s_text.lstrip())
                         rel_start = ann_start_abs - s_start - leading_spaces
                         rel_end = ann_end_abs - s_start - leading_spaces
-                        clean_s_text = s_text.strip()
                         rel_start = max(0, rel_start)
                         rel_end = min(len(clean_s_text), rel_end)
 
-                        new_line_starts = [0]
-                        for j, char in enumerate(clean_s_text):
-                            if char == '\n': new_line_starts.append(j + 1)
-                        new_line_starts.append(len(clean_s_text) + 1)
-
-                        new_start_pos = self._char_offset_to_tkinter_index_from_offsets(new_line_starts, rel_start)
-                        new_end_pos = self._char_offset_to_tkinter_index_from_offsets(new_line_starts, rel_end)
-
-                        try:
-                            start_l, start_c = map(int, new_start_pos.split('.'))
-                            end_l, end_c = map(int, new_end_pos.split('.'))
-                        except ValueError: continue
+                        start_l, start_c = self._char_offset_to_lc(new_line_starts, rel_start)
+                        end_l, end_c = self._char_offset_to_lc(new_line_starts, rel_end)
 
                         new_ann = {
                             'id': ann['id'], 'start_line': start_l, 'start_char': start_c,
@@ -173,9 +170,9 @@ class FilesMixin:
         self._reset_state()
         self.files_list = new_files_list
         self.annotations = new_annotations
+        self._dirty = True
 
-        for path in self.files_list:
-            self.files_listbox.insert(tk.END, os.path.basename(path))
+        self.files_listbox.insert(tk.END, *[os.path.basename(path) for path in self.files_list])
         if self.files_list: self.load_file(0)
         self.progress_bar.stop()
         self.status_var.set(f"Conversion complete. Generated {len(self.files_list)} sentences for training.")
@@ -192,7 +189,7 @@ class FilesMixin:
         if not source_paths: return
         destination_dir = os.path.dirname(self.files_list[0])
         current_basenames = {os.path.basename(p) for p in self.files_list}
-        added_count = 0
+        added_paths = []
         xml_converted = 0
         for source_path in source_paths:
             basename = os.path.basename(source_path)
@@ -215,16 +212,30 @@ class FilesMixin:
                     except Exception as e:
                         messagebox.showerror("Copy Error", f"Could not copy file '{basename}'.\n\nError: {e}", parent=self.root)
                         continue
-            self.files_list.append(dest_path)
-            added_count += 1
+            added_paths.append(dest_path)
 
+        added_count = len(added_paths)
         if added_count > 0:
             current_selection_path = self.current_file_path
-            self.files_list.sort(key=lambda p: os.path.basename(p).lower())
-            self.files_listbox.delete(0, tk.END)
-            for path in self.files_list: self.files_listbox.insert(tk.END, os.path.basename(path))
-            if current_selection_path in self.files_list:
-                new_index = self.files_list.index(current_selection_path)
+            sort_keys = [os.path.basename(p).lower() for p in self.files_list]
+            if all(sort_keys[i] <= sort_keys[i + 1] for i in range(len(sort_keys) - 1)):
+                # Already in order: slot each new file in place instead of refilling the listbox.
+                for path in added_paths:
+                    key = os.path.basename(path).lower()
+                    index = bisect_right(sort_keys, key)
+                    sort_keys.insert(index, key)
+                    self.files_list.insert(index, path)
+                    self.files_listbox.insert(index, os.path.basename(path))
+            else:
+                self.files_list.extend(added_paths)
+                self.files_list.sort(key=lambda p: os.path.basename(p).lower())
+                self.files_listbox.delete(0, tk.END)
+                self.files_listbox.insert(tk.END, *[os.path.basename(path) for path in self.files_list])
+            self._file_path_to_index = None
+            self._dirty = True
+            new_index = self._file_index(current_selection_path)
+            if new_index is not None:
+                self.current_file_index = new_index
                 self.files_listbox.selection_set(new_index)
                 self.files_listbox.see(new_index)
                 self.files_listbox.activate(new_index)
@@ -232,35 +243,45 @@ class FilesMixin:
             msg = f"Successfully added {added_count - xml_converted} file(s) and converted {xml_converted} XML file(s) to the session."
             self.status_var.set(msg)
 
-    def load_file(self, index):
+    def load_file(self, index, sync_listbox=True):
         if not (0 <= index < len(self.files_list)): return
         if index == self.current_file_index: return
+        self._stash_entity_lookup_map()
         self.clear_views()
         self.current_file_index = index
         self.current_file_path = self.files_list[index]
         filename = os.path.basename(self.current_file_path)
-        self.files_listbox.selection_clear(0, tk.END)
-        self.files_listbox.selection_set(index)
-        self.files_listbox.activate(index)
-        self.files_listbox.see(index)
+        # A click in the listbox has already selected, activated and shown the row.
+        if sync_listbox:
+            self.files_listbox.selection_clear(0, tk.END)
+            self.files_listbox.selection_set(index)
+            self.files_listbox.activate(index)
+            self.files_listbox.see(index)
         self.text_area.config(state=tk.NORMAL)
         self.text_area.delete(1.0, tk.END)
         try:
             with open(self.current_file_path, 'r', encoding='utf-8') as f:
                 file_content = f.read()
-                self.text_area.insert(tk.END, file_content)
-
-            self.line_start_offsets = [0]
-            for i, char in enumerate(file_content):
-                if char == '\n': self.line_start_offsets.append(i + 1)
-            self.line_start_offsets.append(len(file_content) + 1)
-
-            file_data = self.annotations.setdefault(self.current_file_path, {"entities": [], "relations": []})
-            self._build_entity_lookup_map(file_data.get("entities", []))
-            self.update_entities_list()
-            self.update_relations_list()
-            self.apply_annotations_to_text()
-            self.status_var.set(f"Loaded: {filename} ({index + 1}/{len(self.files_list)})")
+            # Large files go in a chunk at a time so the first screen shows at once and the
+            # event loop keeps running; highlighting waits for the last chunk.
+            first_end = self._text_chunk_end(file_content, 0)
+            self.text_area.insert(tk.END, file_content[:first_end])
+
+            self.line_start_offsets = self._compute_line_starts(file_content)
+
+            self.annotations.setdefault(self.current_file_path, {"entities": [], "relations": []})
+            self._load_entity_lookup_map(self.current_file_path)
+            # The text paints first; trees and highlights are rebuilt on the next idle pass
+            # (and coalesced if the user has already moved on to another file).
+            chunked = first_end < len(file_content)
+            self._text_loading = chunked
+            self._schedule_refresh(entities=True, relations=True, highlight=not chunked)
+            loaded_status = f"Loaded: {filename} ({index + 1}/{len(self.files_list)})"
+            if chunked:
+                self.status_var.set(f"Loading: {filename}...")
+                self.root.after_idle(self._continue_text_load, self._text_load_generation, file_content, first_end, loaded_status)
+            else:
+                self.status_var.set(loaded_status)
             self.text_area.edit_reset()
         except Exception as e:
             messagebox.showerror("Error Reading File", f"Failed to load file '{filename}':\n{str(e)}", parent=self.root)
@@ -271,6 +292,32 @@ class FilesMixin:
             self.text_area.config(state=tk.DISABLED)
             self._update_button_states()
 
+    def _text_chunk_end(self, content, pos):
+        end = pos + _LOAD_CHUNK_CHARS
+        if end >= len(content): return len(content)
+        # Prefer ending a chunk on a line break so each insert adds whole lines.
+        newline = content.rfind('\n', pos, end)
+        return newline + 1 if newline != -1 else end
+
+    def _continue_text_load(self, generation, content, pos, loaded_status):
+        if generation != self._text_load_generation: return
+        end = self._text_chunk_end(content, pos)
+        original_state = self.text_area.cget('state')
+        self.text_area.config(state=tk.NORMAL)
+        try: self.text_area.insert(tk.END, content[pos:end])
+        finally: self.text_area.config(state=original_state)
+        if end < len(content):
+            self.root.after_idle(self._continue_text_load, generation, content, end, loaded_status)
+            return
+        self._text_loading = False
+        self.apply_annotations_to_text()
+        self.text_area.edit_reset()
+        self.status_var.set(loaded_status)
+        self._update_button_states()
+        if self._pending_search_term is not None:
+            term, self._pending_search_term = self._pending_search_term, None
+            self._highlight_term_in_current_file(term)
+
     def load_next_file(self):
         if 0 <= self.current_file_index < len(self.files_list) - 1:
             self.load_file(self.current_file_index + 1)
@@ -282,7 +329,7 @@ class FilesMixin:
     def on_file_select(self, event):
         selected_indices = self.files_listbox.curselection()
         if selected_indices and selected_indices[0] != self.current_file_index:
-            self.load_file(selected_indices[0])
+            self.load_file(selected_indices[0], sync_listbox=False)
 
     def _on_files_right_click(self, event):
         try:
@@ -304,7 +351,10 @@ class FilesMixin:
 
         if not messagebox.askyesno("Confirm Removal", f"Are you sure you want to remove '{filename}' from this session?", parent=self.root): return
         self.files_list.pop(index_to_delete)
+        self._file_path_to_index = None
+        self._dirty = True
         self.annotations.pop(file_path_to_delete, None)
+        self._entity_lookup_maps.pop(file_path_to_delete, None)
         self.files_listbox.delete(index_to_delete)
 
         if self.current_file_index == index_to_delete:
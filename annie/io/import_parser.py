@@ -9,6 +9,10 @@ import traceback
 from bisect import bisect_left, bisect_right
 import xml.etree.ElementTree as ET
 import os
+import sys
+
+_CONLL_DOC_SPLIT_RE = re.compile(r'\n\s*\n|-DOCSTART-.*\n')
+_JSON_WS_RE = re.compile(r'\s*')
 
 # ── Diplomatically-structured part definitions ──────────────────────
 # Macro elements are XML wrappers that contain sub-parts.
@@ -134,24 +138,22 @@ class ImportMixin:
                 save_path = os.path.join(save_dir, f"{base_name_for_docs}_{i + 1}.txt")
                 with open(save_path, 'w', encoding='utf-8') as f: f.write(doc['text'])
                 self.files_list.append(save_path)
+                self._file_path_to_index = None
                 new_file_paths.append(save_path)
                 final_annotations = []
-                line_starts = [0]
-                for j, char in enumerate(doc['text']):
-                    if char == '\n': line_starts.append(j + 1)
-                line_starts.append(len(doc['text']) + 1)
+                line_starts = self._compute_line_starts(doc['text'])
+                line_chars = self._offsets_to_line_chars(line_starts, [pos for ann in doc['annotations'] for pos in (ann['start'], ann['end'])])
 
                 for ann in doc['annotations']:
-                    start_pos_str = self._char_offset_to_tkinter_index_from_offsets(line_starts, ann['start'])
-                    end_pos_str = self._char_offset_to_tkinter_index_from_offsets(line_starts, ann['end'])
-                    start_line, start_char = map(int, start_pos_str.split('.'))
-                    end_line, end_char = map(int, end_pos_str.split('.'))
+                    start_line, start_char = line_chars[ann['start']]
+                    end_line, end_char = line_chars[ann['end']]
                     text = doc['text'][ann['start']:ann['end']]
                     final_annotations.append({'id': uuid.uuid4().hex, 'start_line': start_line, 'start_char': start_char,
                                               'end_line': end_line, 'end_char': end_char, 'text': text, 'tag': ann['tag']})
                 self.annotations[save_path] = {"entities": final_annotations, "relations": []}
+                self._invalidate_entity_caches(save_path)
             self.files_listbox.delete(0, tk.END)
-            for path in self.files_list: self.files_listbox.insert(tk.END, os.path.basename(path))
+            self.files_listbox.insert(tk.END, *[os.path.basename(path) for path in self.files_list])
             self.load_file(len(self.files_list) - len(new_file_paths))
             self.status_var.set(f"Successfully imported {len(parsed_docs)} documents.")
         except Exception as e:
@@ -213,11 +215,7 @@ class ImportMixin:
                 continue
 
             # Compute line-starts for tkinter index conversion
-            line_starts = [0]
-            for i, ch in enumerate(content):
-                if ch == '\n':
-                    line_starts.append(i + 1)
-            line_starts.append(len(content) + 1)
+            line_starts = self._compute_line_starts(content)
 
             # Locate the document text within the file content
             # (the file may contain the document as a contiguous block)
@@ -245,15 +243,8 @@ class ImportMixin:
             for ann in doc['annotations']:
                 start_char = pos + ann['start']
                 end_char = pos + ann['end']
-                start_str = self._char_offset_to_tkinter_index_from_offsets(
-                    line_starts, start_char)
-                end_str = self._char_offset_to_tkinter_index_from_offsets(
-                    line_starts, end_char)
-                try:
-                    sl, sc = map(int, start_str.split('.'))
-                    el, ec = map(int, end_str.split('.'))
-                except ValueError:
-                    continue
+                sl, sc = self._char_offset_to_lc(line_starts, start_char)
+                el, ec = self._char_offset_to_lc(line_starts, end_char)
 
                 tag_name = ann['tag']
                 all_used_tags.add(tag_name)
@@ -274,6 +265,7 @@ class ImportMixin:
             file_anns = self.annotations.setdefault(
                 matched_path, {"entities": [], "relations": []})
             file_anns['entities'].extend(new_entities)
+            self._invalidate_entity_caches(matched_path)
             total_annotations += len(new_entities)
             annotated_files += 1
 
@@ -316,7 +308,7 @@ class ImportMixin:
 
     def _parse_conll_into_documents(self, file_path):
         with open(file_path, 'r', encoding='utf-8') as f: content = f.read()
-        doc_chunks = re.split(r'\n\s*\n|-DOCSTART-.*\n', content)
+        doc_chunks = _CONLL_DOC_SPLIT_RE.split(content)
         documents, all_tags = [], set()
         for chunk in doc_chunks:
             if not chunk.strip(): continue
@@ -329,28 +321,33 @@ class ImportMixin:
 
     def _parse_jsonl_into_documents(self, file_path):
         documents, all_tags = [], set()
+        raw_decode, skip_ws = json.JSONDecoder().raw_decode, _JSON_WS_RE.match
+        # Stream the file a line at a time; within a line, decode object after object so
+        # objects run together ("}{") are still accepted.
         with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            json_objects_str = content.replace('}{', '}\n{').splitlines()
-            for line in json_objects_str:
-                if not line.strip(): continue
-                data = json.loads(line)
-                text = data.get("text")
-                spans = data.get("spans", [])
-                if text:
-                    annotations = []
-                    for span in spans:
-                        start = span.get("start")
-                        end = span.get("end")
-                        tag = span.get("label")
-                        if start is not None and end is not None and tag is not None:
-                            annotations.append({'start': start, 'end': end, 'tag': tag})
-                            all_tags.add(tag)
-                    documents.append({'text': text, 'annotations': annotations})
+            for line in f:
+                pos, n = skip_ws(line, 0).end(), len(line)
+                while pos < n:
+                    data, pos = raw_decode(line, pos)
+                    pos = skip_ws(line, pos).end()
+                    text = data.get("text")
+                    spans = data.get("spans", [])
+                    if text:
+                        annotations = []
+                        for span in spans:
+                            start = span.get("start")
+                            end = span.get("end")
+                            tag = span.get("label")
+                            if isinstance(tag, str): tag = sys.intern(tag)
+                            if start is not None and end is not None and tag is not None:
+                                annotations.append({'start': start, 'end': end, 'tag': tag})
+                                all_tags.add(tag)
+                        documents.append({'text': text, 'annotations': annotations})
         return documents, all_tags
 
     def _process_conll_chunk(self, lines):
-        reconstructed_text = ""
+        text_parts = []
+        last_char = ""
         annotations = []
         found_tags = set()
         current_char = 0
@@ -358,8 +355,9 @@ class ImportMixin:
         for line in lines:
             line = line.strip()
             if not line:
-                if reconstructed_text and not reconstructed_text.endswith(('\n', ' ')):
-                    reconstructed_text += "\n"
+                if text_parts and last_char not in ('\n', ' '):
+                    text_parts.append("\n")
+                    last_char = "\n"
                     current_char += 1
                 if current_entity: annotations.append(current_entity)
                 current_entity = None
@@ -367,11 +365,12 @@ class ImportMixin:
             parts = line.split()
             if len(parts) < 2: continue
             token, tag = parts[0], parts[-1]
-            if reconstructed_text and not reconstructed_text.endswith('\n'):
-                reconstructed_text += " "
+            if text_parts and last_char != '\n':
+                text_parts.append(" ")
                 current_char += 1
             start_char = current_char
-            reconstructed_text += token
+            text_parts.append(token)
+            last_char = token[-1]
             current_char += len(token)
             end_char = current_char
             if tag.startswith("B-"):
@@ -385,7 +384,7 @@ class ImportMixin:
                 if current_entity: annotations.append(current_entity)
                 current_entity = None
         if current_entity: annotations.append(current_entity)
-        return reconstructed_text, annotations, found_tags
+        return "".join(text_parts), annotations, found_tags
 
     def _parse_cei_xml_into_documents(self, file_path):
         """
@@ -674,10 +673,9 @@ class ImportMixin:
             return
 
         # Find all XML files
-        xml_files = sorted([
-            os.path.join(xml_dir, f) for f in os.listdir(xml_dir)
-            if f.lower().endswith('.xml') and os.path.isfile(os.path.join(xml_dir, f))
-        ])
+        with os.scandir(xml_dir) as it:
+            xml_files = sorted(entry.path for entry in it
+                               if entry.name.lower().endswith('.xml') and entry.is_file())
 
         if not xml_files:
             messagebox.showinfo("No XML Files",
@@ -965,12 +963,12 @@ class ImportMixin:
                 if truly_new:
                     self.files_list.extend(truly_new)
                     self.files_list.sort(key=lambda p: os.path.basename(p).lower())
+                    self._file_path_to_index = None
                     current_path = self.current_file_path
                     self.files_listbox.delete(0, tk.END)
-                    for fp in self.files_list:
-                        self.files_listbox.insert(tk.END, os.path.basename(fp))
-                    if current_path and current_path in self.files_list:
-                        idx = self.files_list.index(current_path)
+                    self.files_listbox.insert(tk.END, *[os.path.basename(fp) for fp in self.files_list])
+                    idx = self._file_index(current_path) if current_path else None
+                    if idx is not None:
                         self.files_listbox.selection_set(idx)
                         self.files_listbox.see(idx)
                         self.files_listbox.activate(idx)
@@ -1123,25 +1121,13 @@ class ImportMixin:
                 match_pos = raw_pos
 
             # Compute tkinter indices for the matched position
-            line_starts = [0]
-            for i, ch in enumerate(content):
-                if ch == '\n':
-                    line_starts.append(i + 1)
-            line_starts.append(len(content) + 1)
+            line_starts = self._compute_line_starts(content)
 
             end_pos = match_pos + len(part_text)
             end_pos = min(end_pos, len(content))
 
-            start_str = self._char_offset_to_tkinter_index_from_offsets(
-                line_starts, match_pos)
-            end_str = self._char_offset_to_tkinter_index_from_offsets(
-                line_starts, end_pos)
-
-            try:
-                start_l, start_c = map(int, start_str.split('.'))
-                end_l, end_c = map(int, end_str.split('.'))
-            except ValueError:
-                continue
+            start_l, start_c = self._char_offset_to_lc(line_starts, match_pos)
+            end_l, end_c = self._char_offset_to_lc(line_starts, end_pos)
 
             annotation = {
                 'id': uuid.uuid4().hex,
@@ -1182,22 +1168,10 @@ class ImportMixin:
                 except Exception:
                     continue
 
-                line_starts = [0]
-                for i, ch in enumerate(content):
-                    if ch == '\n':
-                        line_starts.append(i + 1)
-                line_starts.append(len(content) + 1)
-
-                m_start_str = self._char_offset_to_tkinter_index_from_offsets(
-                    line_starts, m_start)
-                m_end_str = self._char_offset_to_tkinter_index_from_offsets(
-                    line_starts, m_end)
+                line_starts = self._compute_line_starts(content)
 
-                try:
-                    ml, mc = map(int, m_start_str.split('.'))
-                    el, ec = map(int, m_end_str.split('.'))
-                except ValueError:
-                    continue
+                ml, mc = self._char_offset_to_lc(line_starts, m_start)
+                el, ec = self._char_offset_to_lc(line_starts, m_end)
 
                 macro_annotation = {
                     'id': uuid.uuid4().hex,
@@ -1229,6 +1203,7 @@ class ImportMixin:
             file_data = self.annotations.setdefault(
                 file_path, {"entities": [], "relations": []})
             file_data["entities"].extend(new_entities)
+            self._invalidate_entity_caches(file_path)
             total_annotations += len(new_entities)
 
         # Refresh UI if the current file received annotations
@@ -1241,8 +1216,8 @@ class ImportMixin:
         elif self.current_file_path is None and file_annotations_map:
             # Load the first annotated file
             first_path = next(iter(file_annotations_map))
-            if first_path in self.files_list:
-                idx = self.files_list.index(first_path)
+            idx = self._file_index(first_path)
+            if idx is not None:
                 self.load_file(idx)
 
         self._update_button_states()
@@ -5,8 +5,26 @@ from tkinter import messagebox
 import json
 import traceback
 import os
+from concurrent.futures import ThreadPoolExecutor
 from annie.constants import SESSION_FILE_VERSION
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _write_json(path, data):
+    # orjson serialises to UTF-8 bytes in C; the stdlib path gives the same document.
+    if orjson is not None:
+        with open(path, 'wb') as f: f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(path, 'w', encoding='utf-8', buffering=1 << 20) as f: json.dump(data, f, indent=2, ensure_ascii=False)
+
+def _read_json(path):
+    if orjson is not None:
+        with open(path, 'rb') as f: return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f: return json.load(f)
+
 class SessionMixin:
     """Save/load session + schema + lifecycle."""
 
@@ -24,7 +42,7 @@ class SessionMixin:
             "relation_types": self.relation_types
         }
         try:
-            with open(save_path, 'w', encoding='utf-8') as f: json.dump(schema_data, f, indent=2)
+            _write_json(save_path, schema_data)
             self.status_var.set(f"Schema saved to {os.path.basename(save_path)}")
         except Exception as e:
             messagebox.showerror("Save Error", f"Could not save schema file:\n{e}", parent=self.root)
@@ -37,7 +55,7 @@ class SessionMixin:
             parent=self.root)
         if not load_path: return
         try:
-            with open(load_path, 'r', encoding='utf-8') as f: schema_data = json.load(f)
+            schema_data = _read_json(load_path)
 
             if "tag_hierarchy" in schema_data:
                 self.tag_hierarchy = schema_data["tag_hierarchy"]
@@ -53,6 +71,7 @@ class SessionMixin:
 
             self.relation_types = schema_data.get("relation_types", [])
             self._sync_flat_tags()
+            self._dirty = True
 
             self._update_entity_tag_combobox()
             self._update_relation_type_combobox()
@@ -85,11 +104,12 @@ class SessionMixin:
             except ValueError:
                 key = os.path.basename(file_path)
             serializable_annotations[key] = {
-                "entities": sorted(data.get("entities", []), key=lambda a: (a['start_line'], a['start_char'])),
+                # Same stable start-position order the click index keeps; reused while unchanged.
+                "entities": self._get_sorted_entities(file_path)[3],
                 "relations": sorted(data.get("relations", []), key=lambda r: (r.get('type', ''), r.get('head_id', '')))
             }
         try:
-            with open(save_path, 'w', encoding='utf-8') as f: json.dump(serializable_annotations, f, indent=2, ensure_ascii=False)
+            _write_json(save_path, serializable_annotations)
             self.status_var.set(f"Annotations saved to '{os.path.basename(save_path)}'")
         except Exception as e:
             messagebox.showerror("Save Error", f"Could not write annotations to file:\n{e}", parent=self.root)
@@ -135,8 +155,9 @@ class SessionMixin:
         }
 
         try:
-            with open(save_path, 'w', encoding='utf-8') as f: json.dump(session_data, f, indent=2, ensure_ascii=False)
+            _write_json(save_path, session_data)
             self.session_save_path = save_path
+            self._dirty = False
             self.status_var.set(f"Session saved to '{os.path.basename(save_path)}'")
             base_dir_name = os.path.basename(os.path.dirname(self.files_list[0]))
             self.root.title(f"ANNIE - {base_dir_name} [{os.path.basename(save_path)}]")
@@ -155,7 +176,7 @@ class SessionMixin:
         if not load_path: return
 
         try:
-            with open(load_path, 'r', encoding='utf-8') as f: session_data = json.load(f)
+            session_data = _read_json(load_path)
         except Exception as e:
             messagebox.showerror("Load Session Error", f"Could not read session file:\n{e}", parent=self.root)
             return
@@ -169,7 +190,12 @@ class SessionMixin:
             messagebox.showerror("Load Session Error", "Session file is missing tag definitions.", parent=self.root)
             return
 
-        missing_files = [fp for fp in session_data["files_list"] if not os.path.isfile(fp)]
+        # Stat the session's files in parallel; on network drives each check is a round trip.
+        session_files = session_data["files_list"]
+        if len(session_files) > 16:
+            with ThreadPoolExecutor(max_workers=8) as pool: file_exists = list(pool.map(os.path.isfile, session_files))
+        else: file_exists = [os.path.isfile(fp) for fp in session_files]
+        missing_files = [fp for fp, exists in zip(session_files, file_exists) if not exists]
         if missing_files:
             msg = "Some text files could not be found:\n- " + "\n- ".join(os.path.basename(p) for p in missing_files[:5])
             if len(missing_files) > 5: msg += "\n..."
@@ -179,6 +205,7 @@ class SessionMixin:
         try:
             self.files_list = session_data["files_list"]
             self.annotations = session_data["annotations"]
+            self._intern_entity_tags(self.annotations)
 
             if "tag_hierarchy" in session_data:
                 self.tag_hierarchy = session_data["tag_hierarchy"]
@@ -221,10 +248,10 @@ class SessionMixin:
             self.llm_few_shot_count = session_data.get("llm_few_shot_count", 3)
 
             self.files_listbox.delete(0, tk.END)
-            for file_path in self.files_list:
-                display_name = os.path.basename(file_path)
-                if file_path in missing_files: display_name += " [MISSING]"
-                self.files_listbox.insert(tk.END, display_name)
+            # One Tcl insert for the whole list instead of one call per file.
+            missing_set = set(missing_files)
+            self.files_listbox.insert(tk.END, *[os.path.basename(file_path) + (" [MISSING]" if file_path in missing_set else "")
+                                                for file_path in self.files_list])
 
             self._update_entity_tag_combobox()
             self._update_relation_type_combobox()
@@ -240,6 +267,7 @@ class SessionMixin:
 
             base_dir_name = os.path.basename(os.path.dirname(self.files_list[0])) if self.files_list else "Session"
             self.root.title(f"ANNIE - {base_dir_name} [{os.path.basename(load_path)}]")
+            self._dirty = False
 
         except Exception as e:
             messagebox.showerror("Load Session Error", f"Error applying session data:\n{e}", parent=self.root)
@@ -248,7 +276,7 @@ class SessionMixin:
         finally:
             self._update_button_states()
 
-    def _has_unsaved_changes(self): return bool(self.files_list)
+    def _has_unsaved_changes(self): return self._dirty
 
     def _on_closing(self):
         if self._has_unsaved_changes():
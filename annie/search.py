@@ -65,6 +65,10 @@ class SearchMixin:
         tk.Label(results_window, text="Double-click on the file to open and highlight it.", fg="grey").pack(pady=5)
 
     def _highlight_term_in_current_file(self, term):
+        # A chunked load is still filling the widget; highlight once the last chunk is in.
+        if self._text_loading:
+            self._pending_search_term = term
+            return
         original_state = self.text_area.cget('state')
         self.text_area.config(state=tk.NORMAL)
         try:
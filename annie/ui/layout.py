@@ -2,7 +2,11 @@
 import tkinter as tk
 from tkinter import ttk
 import time
-from bisect import bisect_left, bisect_right
+import re
+from annie.core import parse_text_index
+
+_WORD_RE = re.compile(r'\w+')
+_WORD_WINDOW = 256
 
 class LayoutMixin:
     """Main UI layout + treeview/click helpers."""
@@ -144,20 +148,25 @@ class LayoutMixin:
 
     def _treeview_sort_column(self, tree, col, reverse):
         items = tree.get_children("")
+        # Row values are mirrored on the Python side at insert time; only rows missing
+        # from the mirror fall back to asking Tk.
+        row_values = self._iid_to_values if tree == self.entities_tree else self._relation_iid_to_values
+        col_index = list(tree["columns"]).index(col)
+        column_values = [(str(row_values[item][col_index]) if item in row_values else tree.set(item, col), item) for item in items]
         if col in ["Start", "End"] and tree == self.entities_tree:
-            data = [(tuple(map(int, tree.set(item, col).split('.'))), item)
-                    if tree.set(item, col) else ((0, 0), item) for item in items]
+            data = [(parse_text_index(value) if value else (0, 0), item) for value, item in column_values]
         else:
-            data = [(tree.set(item, col).lower(), item) for item in items]
+            data = [(value.lower(), item) for value, item in column_values]
 
         data.sort(reverse=reverse)
-        for index, (_, item) in enumerate(data): tree.move(item, "", index)
-        valid_selection = [s for s in tree.selection() if tree.exists(s)]
+        # Reorder all rows with a single Tcl call instead of one move per row.
+        tree.set_children("", *[item for _, item in data])
+        valid_selection = tree.selection()
         if valid_selection:
             tree.selection_set(valid_selection)
             tree.see(valid_selection[0])
         else:
-            if tree == self.entities_tree: self.selected_entity_ids_for_relation = []
+            if tree == self.entities_tree: self.selected_entity_ids_for_relation = set()
             self._update_button_states()
 
         for column_id in tree["displaycolumns"]:
@@ -209,22 +218,8 @@ class LayoutMixin:
             self.text_area.config(state=tk.NORMAL)
             try:
                 click_index_str = self.text_area.index(f"@{event.x},{event.y}")
-                click_pos = tuple(map(int, click_index_str.split('.')))
-                entities = self.annotations.get(self.current_file_path, {}).get("entities", [])
-
-                sorted_entities = sorted(entities, key=lambda e: (e['start_line'], e['start_char']))
-                start_positions = [(e['start_line'], e['start_char']) for e in sorted_entities]
-                idx = bisect_left(start_positions, click_pos)
-                clicked_entity_dict = None
-
-                for i in range(max(0, idx - 1), min(len(sorted_entities), idx + 1)):
-                    entity = sorted_entities[i]
-                    start_pos_tuple = (entity['start_line'], entity['start_char'])
-                    end_pos_tuple = (entity['end_line'], entity['end_char'])
-                    if start_pos_tuple <= click_pos < end_pos_tuple:
-                        clicked_entity_dict = entity
-                        break
-
+                click_line, click_char = parse_text_index(click_index_str)
+                clicked_entity_dict = self._find_entity_at(self.current_file_path, click_line, click_char)
                 if clicked_entity_dict:
                     self._remove_entity_instance(clicked_entity_dict)
             except (tk.TclError, ValueError): pass
@@ -239,21 +234,28 @@ class LayoutMixin:
         self.text_area.config(state=tk.NORMAL)
         try:
             click_index_str = self.text_area.index(f"@{event.x},{event.y}")
-            click_pos = tuple(map(int, click_index_str.split('.')))
-            entities = self.annotations.get(self.current_file_path, {}).get("entities", [])
-
-            sorted_entities = sorted(entities, key=lambda e: (e['start_line'], e['start_char']))
-            start_positions = [(e['start_line'], e['start_char']) for e in sorted_entities]
-            idx = bisect_left(start_positions, click_pos)
-            for i in range(max(0, idx - 1), min(len(sorted_entities), idx + 1)):
-                entity = sorted_entities[i]
-                start_pos = (entity['start_line'], entity['start_char'])
-                end_pos = (entity['end_line'], entity['end_char'])
-                if start_pos <= click_pos < end_pos:
-                    return "break"
+            click_line, click_char = parse_text_index(click_index_str)
+            if self._find_entity_at(self.current_file_path, click_line, click_char): return "break"
 
-            word_start = self.text_area.index(f"{click_index_str} wordstart")
-            word_end = self.text_area.index(f"{click_index_str} wordend")
+            # One read of a window around the click replaces Tk's separate wordstart/wordend
+            # lookups; the window only grows if the word runs into its edge. Like Tk, a
+            # non-word character counts as a one-character word.
+            window = _WORD_WINDOW
+            while True:
+                lo, hi = max(0, click_char - window), click_char + window
+                text = self.text_area.get(f"{click_line}.{lo}", f"{click_line}.{hi}")
+                rel = click_char - lo
+                start_char, end_char = click_char, click_char + 1 if rel < len(text) else click_char
+                if _WORD_RE.match(text, rel):
+                    start = rel
+                    while start > 0 and (text[start - 1].isalnum() or text[start - 1] == '_'): start -= 1
+                    end = _WORD_RE.match(text, start).end()
+                    if (start == 0 and lo > 0) or end == hi - lo:
+                        window *= 4
+                        continue
+                    start_char, end_char = lo + start, lo + end
+                break
+            word_start, word_end = f"{click_line}.{start_char}", f"{click_line}.{end_char}"
             if word_start != word_end:
                 self.text_area.tag_remove(tk.SEL, "1.0", tk.END)
                 self.text_area.tag_add(tk.SEL, word_start, word_end)
@@ -265,5 +267,5 @@ class LayoutMixin:
         return "break"
 
     def _remove_entity_instance(self, entity_to_remove):
-        if not self.current_file_path or self.current_file_path not in self.annotations: return
+        if not self.current_file_path or self._text_loading or self.current_file_path not in self.annotations: return
         self._handle_entity_deletion([entity_to_remove])
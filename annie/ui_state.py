@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
 import tkinter as tk
+from collections import defaultdict
 
 class UIStateMixin:
     """Cross-cutting widget repaint + state-sync (the 'repaint quintet')."""
 
+    _DISP_TRANS = str.maketrans({'\n': ' ', '\r': None})
+
     def _configure_text_tags(self):
         for tag in self.entity_tags:
             color = self.get_color_for_tag(tag)
@@ -53,7 +56,15 @@ class UIStateMixin:
             self.relation_type_combobox.config(state="readonly")
 
     def _update_button_states(self):
-        file_loaded = bool(self.current_file_path)
+        # Coalesce bursts of calls (multi-row selection, batch edits) into one recompute per idle tick.
+        if self._button_state_pending: return
+        self._button_state_pending = True
+        self.root.after_idle(self._do_update_button_states)
+
+    def _do_update_button_states(self):
+        self._button_state_pending = False
+        # Until a chunked load finishes the widget holds only part of the document.
+        file_loaded = bool(self.current_file_path) and not self._text_loading
         has_files = bool(self.files_list)
         num_entities_selected_rows = len(self.entities_tree.selection())
         num_relations_selected = len(self.relations_tree.selection())
@@ -62,7 +73,7 @@ class UIStateMixin:
         self.annotate_btn.config(state=tk.NORMAL if file_loaded and self.get_active_tags() else tk.DISABLED)
         self.remove_entity_btn.config(state=tk.NORMAL if num_entities_selected_rows > 0 else tk.DISABLED)
         self.merge_entities_btn.config(state=tk.NORMAL if num_entities_selected_rows >= 2 else tk.DISABLED)
-        can_propagate_current = file_loaded and self.annotations.get(self.current_file_path, {}).get("entities")
+        can_propagate_current = file_loaded and not self._is_propagating and self.annotations.get(self.current_file_path, {}).get("entities")
         self.propagate_btn.config(state=tk.NORMAL if can_propagate_current else tk.DISABLED)
         can_add_relation = len(self.selected_entity_ids_for_relation) == 2 and self.relation_types
         self.add_relation_btn.config(state=tk.NORMAL if can_add_relation else tk.DISABLED)
@@ -71,23 +82,30 @@ class UIStateMixin:
         self.remove_relation_btn.config(state=tk.NORMAL if can_modify_relation else tk.DISABLED)
 
     def clear_views(self):
+        self._text_load_generation += 1  # cancels any chunked text insert still queued
+        self._text_loading = False
+        self._pending_search_term = None
         original_state = self.text_area.cget('state')
         self.text_area.config(state=tk.NORMAL)
         try:
+            # Deleting all text drops every tag range with it; no per-tag removal needed.
             self.text_area.delete(1.0, tk.END)
-            tags_to_clear = set(self.entity_tags) | {"propagated_entity", "selection_highlight", "low_confidence", "relation_highlight", tk.SEL}
-            for tag in tags_to_clear:
-                try: self.text_area.tag_remove(tag, "1.0", tk.END)
-                except tk.TclError: pass
         finally:
             self.text_area.config(state=original_state)
-        try: self.entities_tree.delete(*self.entities_tree.get_children())
-        except Exception: pass
-        try: self.relations_tree.delete(*self.relations_tree.get_children())
-        except Exception: pass
-        self.selected_entity_ids_for_relation = []
+        # Hide the columns while rows go and ignore the selection event the delete
+        # queues; the entities handler runs once afterwards on the empty tree.
+        self._entities_tree_rebuilding = True
+        for tree in (self.entities_tree, self.relations_tree):
+            display_columns = self._freeze_tree(tree)
+            try: tree.delete(*tree.get_children())
+            except Exception: pass
+            finally: self._thaw_tree(tree, display_columns)
+        self.root.after(20, self._finish_entities_tree_rebuild)
+        self.selected_entity_ids_for_relation = set()
         self._entity_id_to_tree_iids = {}
-        self._entity_lookup_map.clear()
+        self._iid_to_values.clear()
+        self._relation_iid_to_values.clear()
+        self._entity_lookup_map = {}
         self.line_start_offsets = [0]
 
     def apply_annotations_to_text(self):
@@ -95,96 +113,297 @@ class UIStateMixin:
         original_state = self.text_area.cget('state')
         self.text_area.config(state=tk.NORMAL)
         try:
-            tags_to_clear = set(self.entity_tags) | {"propagated_entity", "low_confidence", "relation_highlight"}
-            for tag in tags_to_clear: self.text_area.tag_remove(tag, "1.0", tk.END)
+            self._remove_text_tags(set(self.entity_tags) | {"propagated_entity", "low_confidence", "relation_highlight"})
 
             entities = self.annotations.get(self.current_file_path, {}).get("entities", [])
+            # Marker tags are collected like entity tags; stacking order comes from the tags'
+            # priorities, not the order ranges are added, so batching them looks the same.
+            ranges_by_tag = defaultdict(list)
+            low_confidence_ranges, propagated_ranges = [], []
+            entity_tags, is_visible = self.entity_tags, self.tag_visible_states.get
             for ann in entities:
                 try:
-                    start_pos = f"{ann['start_line']}.{ann['start_char']}"
-                    end_pos = f"{ann['end_line']}.{ann['end_char']}"
                     tag = ann['tag']
-                    if tag in self.entity_tags and self.tag_visible_states.get(tag, True):
-                        self.text_area.tag_add(tag, start_pos, end_pos)
+                    if tag in entity_tags and is_visible(tag, True):
+                        span = (f"{ann['start_line']}.{ann['start_char']}", f"{ann['end_line']}.{ann['end_char']}")
+                        ranges_by_tag[tag].extend(span)
 
-                        if ann.get('score', 1.0) < 0.60:
-                            self.text_area.tag_add("low_confidence", start_pos, end_pos)
-                        elif ann.get('propagated'):
-                            self.text_area.tag_add("propagated_entity", start_pos, end_pos)
+                        if ann.get('score', 1.0) < 0.60: low_confidence_ranges.extend(span)
+                        elif ann.get('propagated'): propagated_ranges.extend(span)
                 except Exception: pass
+            for tag, ranges in ranges_by_tag.items(): self._batch_tag_add(tag, ranges)
+            self._batch_tag_add("low_confidence", low_confidence_ranges)
+            self._batch_tag_add("propagated_entity", propagated_ranges)
         finally:
             if self.text_area.winfo_exists(): self.text_area.config(state=original_state)
 
+    def _remove_text_tags(self, tags):
+        # One Tcl foreach clears every tag's ranges instead of a Python->Tcl call per tag;
+        # passing the names as a list argument keeps spaces and braces in them intact.
+        if not tags: return
+        try: self.text_area.tk.call('foreach', '_annie_tag', tuple(tags), f'{self.text_area} tag remove $_annie_tag 1.0 end')
+        except tk.TclError:
+            for tag in tags:
+                try: self.text_area.tag_remove(tag, "1.0", tk.END)
+                except tk.TclError: pass
+
+    def _batch_tag_add(self, tag, ranges):
+        # ranges is a flat [start1, end1, start2, end2, ...] list; Tk's "tag add" takes any number of pairs.
+        if not ranges: return
+        try: self.text_area.tag_add(tag, *ranges)
+        except tk.TclError:
+            for i in range(0, len(ranges), 2):
+                try: self.text_area.tag_add(tag, ranges[i], ranges[i + 1])
+                except tk.TclError: pass
+
+    def _batch_tag_remove(self, tag, ranges):
+        # Same flat pair list as _batch_tag_add. Tk's "tag remove" takes any number of pairs,
+        # but Text.tag_remove only passes one, so call it directly.
+        if not ranges: return
+        try: self.text_area.tk.call(str(self.text_area), 'tag', 'remove', tag, *ranges)
+        except tk.TclError:
+            for i in range(0, len(ranges), 2):
+                try: self.text_area.tag_remove(tag, ranges[i], ranges[i + 1])
+                except tk.TclError: pass
+
+    def _freeze_tree(self, tree):
+        # Hiding all columns while rows are inserted skips per-row column layout.
+        display_columns = tree['displaycolumns']
+        tree.configure(displaycolumns=())
+        return display_columns
+
+    def _thaw_tree(self, tree, display_columns):
+        tree.configure(displaycolumns=display_columns)
+
+    def _schedule_refresh(self, entities=False, relations=False, highlight=False, selection_hint=None):
+        if entities: self._pending_refresh['entities'] = True
+        if relations: self._pending_refresh['relations'] = True
+        if highlight: self._pending_refresh['highlight'] = True
+        if selection_hint is not None: self._pending_selection_hint = selection_hint
+        if not self._refresh_scheduled:
+            self._refresh_scheduled = True
+            self.root.after_idle(self._do_refresh)
+
+    def _do_refresh(self):
+        pending = self._pending_refresh
+        selection_hint = self._pending_selection_hint
+        self._pending_refresh = {'entities': False, 'relations': False, 'highlight': False}
+        self._pending_selection_hint = None
+        self._refresh_scheduled = False
+        if pending['highlight']: self.apply_annotations_to_text()
+        if pending['relations']: self.update_relations_list()
+        if pending['entities']: self.update_entities_list(selection_hint=selection_hint)
+
     def update_entities_list(self, selection_hint=None):
+        # Deleting/selecting rows queues one <<TreeviewSelect>> per change; ignore them
+        # until the rebuild is done and then run the selection handler once.
+        self._entities_tree_rebuilding = True
         try: self.entities_tree.delete(*self.entities_tree.get_children())
         except Exception: pass
         self._entity_id_to_tree_iids.clear()
-        if not self.current_file_path: return
+        self._iid_to_values.clear()
+        if not self.current_file_path:
+            self.root.after(20, self._finish_entities_tree_rebuild)
+            return
 
         entities = self.annotations.get(self.current_file_path, {}).get("entities", [])
         if not entities:
-            self.on_entity_select(None)
+            self.root.after(20, self._finish_entities_tree_rebuild)
             return
 
-        sorted_entities = sorted(entities, key=lambda a: (a['start_line'], a['start_char']))
-        entity_id_counts = {eid: sum(1 for e in entities if e['id'] == eid) for eid in {e['id'] for e in entities}}
-
+        # Same stable (start_line, start_char) order as the click-lookup index, which is
+        # only re-sorted after the entity list changes.
+        sorted_entities = self._get_sorted_entities(self.current_file_path)[3]
+        # Merged ids are read off the id lookup map, which edits keep current, so the
+        # rebuild makes a single pass over the entities.
+        instances_by_id = self._entity_lookup_map
+        rows = []
+        iid_to_values, id_to_tree_iids, disp_trans = self._iid_to_values, self._entity_id_to_tree_iids, self._DISP_TRANS
         for ann_index, ann in enumerate(sorted_entities):
             entity_id = ann.get('id', '')
             start_pos_str = f"{ann.get('start_line', 0)}.{ann.get('start_char', 0)}"
             end_pos_str = f"{ann.get('end_line', 0)}.{ann.get('end_char', 0)}"
             tag = ann.get('tag', 'N/A')
             full_text = ann.get('text', '')
-            disp_text = full_text.replace('\n',' ').replace('\r', '')[:60]
-            if len(full_text) > 60: disp_text += "..."
+            disp_text = full_text.translate(disp_trans)
+            if len(disp_text) > 60: disp_text = disp_text[:60] + '...'
 
-            tree_tags_tuple = ('merged',) if entity_id_counts.get(entity_id, 0) > 1 else ()
+            tree_tags_tuple = ('merged',) if len(instances_by_id.get(entity_id, ())) > 1 else ()
             tree_row_iid = f"entity|{entity_id}|{start_pos_str}|{end_pos_str}|{tag}|{ann_index}"
             values_tuple = (entity_id, start_pos_str, end_pos_str, disp_text, tag)
-            self.entities_tree.insert("", tk.END, iid=tree_row_iid, values=values_tuple, tags=tree_tags_tuple)
-            self._entity_id_to_tree_iids.setdefault(entity_id, []).append(tree_row_iid)
+            rows.extend((tree_row_iid, values_tuple, tree_tags_tuple))
+            iid_to_values[tree_row_iid] = values_tuple
+            id_to_tree_iids.setdefault(entity_id, set()).add(tree_row_iid)
 
+        # One Tcl foreach inserts every row instead of a Python->Tcl call per row; the
+        # rows go over as a list argument, so ids and values need no quoting.
+        tree_path, tk_call = str(self.entities_tree), self.entities_tree.tk.call
+        display_columns = self._freeze_tree(self.entities_tree)
+        try:
+            try: tk_call('foreach', ('_annie_iid', '_annie_values', '_annie_tags'), rows,
+                         f'{tree_path} insert {{}} end -id $_annie_iid -values $_annie_values -tags $_annie_tags')
+            except tk.TclError:
+                for i in range(0, len(rows), 3):
+                    if self.entities_tree.exists(rows[i]): continue
+                    try: tk_call(tree_path, 'insert', '', 'end', '-id', rows[i], '-values', rows[i + 1], '-tags', rows[i + 2])
+                    except tk.TclError: pass
+        finally:
+            self._thaw_tree(self.entities_tree, display_columns)
+
+        # The rows just inserted are known on the Python side; no need to ask Tk for them.
         new_iids_to_select = []
-        all_iids_after = self.entities_tree.get_children()
+        all_iids_after = list(self._iid_to_values)
 
         if isinstance(selection_hint, int) and all_iids_after:
             new_index = min(selection_hint, len(all_iids_after) - 1)
             new_iids_to_select.append(all_iids_after[new_index])
         elif isinstance(selection_hint, set):
-            for iid in all_iids_after:
-                try:
-                    parts = iid.split('|')
-                    key = (parts[1], parts[2], parts[3], parts[4])
-                    if key in selection_hint: new_iids_to_select.append(iid)
-                except IndexError: continue
+            for iid, values in self._iid_to_values.items():
+                if (values[0], values[1], values[2], values[4]) in selection_hint: new_iids_to_select.append(iid)
 
         if new_iids_to_select: self.entities_tree.selection_set(new_iids_to_select)
 
-        def restore_focus():
-            current_selection = self.entities_tree.selection()
-            if current_selection:
-                self.entities_tree.focus(current_selection[0])
-                self.entities_tree.see(current_selection[0])
-                self.entities_tree.focus_set()
-                self.on_entity_select(None)
-        self.root.after(20, restore_focus)
+        self.root.after(20, self._finish_entities_tree_rebuild)
         self._update_button_states()
 
+    def _finish_entities_tree_rebuild(self):
+        self._entities_tree_rebuilding = False
+        current_selection = self.entities_tree.selection()
+        if current_selection:
+            self.entities_tree.focus(current_selection[0])
+            self.entities_tree.see(current_selection[0])
+            self.entities_tree.focus_set()
+        self.on_entity_select(None)
+
     def update_relations_list(self):
         selected_iids = self.relations_tree.selection()
         try: self.relations_tree.delete(*self.relations_tree.get_children())
         except Exception: pass
+        self._relation_iid_to_values.clear()
         if not self.current_file_path: return
         entities = self.annotations.get(self.current_file_path, {}).get("entities", [])
         relations = self.annotations.get(self.current_file_path, {}).get("relations", [])
+        entity_display_map = self._get_entity_display_map(self.current_file_path, entities)
+        tree_path, tk_call = str(self.relations_tree), self.relations_tree.tk.call
+        display_columns = self._freeze_tree(self.relations_tree)
+        try:
+            for rel in sorted(relations, key=lambda r: r['type']):
+                values = self._relation_row_values(rel, entity_display_map)
+                tk_call(tree_path, 'insert', '', 'end', '-id', rel['id'], '-values', values)
+                self._relation_iid_to_values[rel['id']] = values
+        finally:
+            self._thaw_tree(self.relations_tree, display_columns)
+        current_relation_ids = {rel['id'] for rel in relations}
+        selected_iids = [iid for iid in selected_iids if iid in current_relation_ids]
+        if selected_iids: self.relations_tree.selection_set(selected_iids)
+        self._update_button_states()
+
+    def _get_entity_display_map(self, file_path, entities):
+        version = self._entities_version.get(file_path, 0)
+        cached = self._entity_display_map_cache.get(file_path)
+        if cached and cached[0] == version: return cached[1]
         entity_display_map = {
             e['id']: f"{e['text'][:25] + ('...' if len(e['text']) > 25 else '')} [{e['tag']}]"
             for e in entities
         }
-        for rel in sorted(relations, key=lambda r: r['type']):
-            head_text = entity_display_map.get(rel['head_id'], f"ID: {rel['head_id'][:6]}...")
-            tail_text = entity_display_map.get(rel['tail_id'], f"ID: {rel['tail_id'][:6]}...")
-            values = (rel['id'], head_text, rel['type'], tail_text)
-            self.relations_tree.insert("", tk.END, iid=rel['id'], values=values)
-        if selected_iids: self.relations_tree.selection_set(selected_iids)
+        self._entity_display_map_cache[file_path] = (version, entity_display_map)
+        return entity_display_map
+
+    def _relation_row_values(self, rel, entity_display_map):
+        head_text = entity_display_map.get(rel['head_id'], f"ID: {rel['head_id'][:6]}...")
+        tail_text = entity_display_map.get(rel['tail_id'], f"ID: {rel['tail_id'][:6]}...")
+        return (rel['id'], head_text, rel['type'], tail_text)
+
+    def _current_entity_display_map(self):
+        entities = self.annotations.get(self.current_file_path, {}).get("entities", [])
+        return self._get_entity_display_map(self.current_file_path, entities)
+
+    # Single-row edits of the relations list; update_relations_list remains the full rebuild.
+    def _insert_relation_row(self, rel):
+        values = self._relation_row_values(rel, self._current_entity_display_map())
+        # The rebuild lists relations stably sorted by type and a new relation is the last
+        # in its list, so its row goes after every row whose type sorts before or equal.
+        position = sum(1 for row in self._relation_iid_to_values.values() if row[2] <= rel['type'])
+        self.relations_tree.insert("", position, iid=rel['id'], values=values)
+        self._relation_iid_to_values[rel['id']] = values
+        self._update_button_states()
+
+    def _update_relation_row(self, rel):
+        values = self._relation_row_values(rel, self._current_entity_display_map())
+        try:
+            self.relations_tree.item(rel['id'], values=values)
+            self._relation_iid_to_values[rel['id']] = values
+        except tk.TclError: self.update_relations_list()
+
+    def _remove_relation_row(self, relation_id):
+        try: self.relations_tree.delete(relation_id)
+        except tk.TclError: pass
+        self._relation_iid_to_values.pop(relation_id, None)
         self._update_button_states()
+
+    def _retag_entity_rows(self, rows, new_tag):
+        """Repaint and re-list relabeled entities in place; rows are (tree iid, entity, old tag)."""
+        def shown(tag): return tag in self.entity_tags and self.tag_visible_states.get(tag, True)
+        # The confidence/propagation overlays only exist on visible entities; let the
+        # full repaint handle a relabel that changes visibility.
+        if any(shown(old_tag) != shown(new_tag) for _, _, old_tag in rows):
+            self.apply_annotations_to_text()
+        else:
+            original_state = self.text_area.cget('state')
+            self.text_area.config(state=tk.NORMAL)
+            try:
+                cleared, removed_ranges = defaultdict(list), defaultdict(list)
+                for _, entity, old_tag in rows:
+                    if old_tag == new_tag or not shown(old_tag): continue
+                    span = ((entity['start_line'], entity['start_char']), (entity['end_line'], entity['end_char']))
+                    removed_ranges[old_tag].extend((f"{span[0][0]}.{span[0][1]}", f"{span[1][0]}.{span[1][1]}"))
+                    cleared[old_tag].append(span)
+                for tag, ranges in removed_ranges.items(): self._batch_tag_remove(tag, ranges)
+                # Entities still carrying an old tag may overlap a cleared range; paint them back.
+                restore = defaultdict(list)
+                for ann in self.annotations.get(self.current_file_path, {}).get("entities", []):
+                    spans = cleared.get(ann['tag'])
+                    if not spans: continue
+                    start, end = (ann['start_line'], ann['start_char']), (ann['end_line'], ann['end_char'])
+                    if any(start < span_end and span_start < end for span_start, span_end in spans):
+                        restore[ann['tag']].extend((f"{start[0]}.{start[1]}", f"{end[0]}.{end[1]}"))
+                for tag, ranges in restore.items(): self._batch_tag_add(tag, ranges)
+                if shown(new_tag):
+                    self._batch_tag_add(new_tag, [pos for _, e, _ in rows for pos in (f"{e['start_line']}.{e['start_char']}", f"{e['end_line']}.{e['end_char']}")])
+            finally:
+                if self.text_area.winfo_exists(): self.text_area.config(state=original_state)
+
+        # The tag is part of the row iid, so each row is replaced at its position.
+        tree = self.entities_tree
+        tree_path, tk_call = str(tree), tree.tk.call
+        new_iids = []
+        self._entities_tree_rebuilding = True
+        try:
+            for iid, entity, old_tag in rows:
+                values = self._iid_to_values.get(iid)
+                if values is None or old_tag == new_tag:
+                    new_iids.append(iid)
+                    continue
+                parts = iid.split('|')
+                new_iid = f"entity|{parts[1]}|{values[1]}|{values[2]}|{new_tag}|{parts[-1]}"
+                new_values = values[:4] + (new_tag,)
+                tk_call(tree_path, 'insert', '', tree.index(iid), '-id', new_iid, '-values', new_values, '-tags', tree.item(iid, 'tags'))
+                tree.delete(iid)
+                self._iid_to_values.pop(iid, None)
+                self._iid_to_values[new_iid] = new_values
+                tree_iids = self._entity_id_to_tree_iids.get(entity['id'])
+                if tree_iids is not None and iid in tree_iids:
+                    tree_iids.discard(iid)
+                    tree_iids.add(new_iid)
+                new_iids.append(new_iid)
+        except tk.TclError:
+            self.update_entities_list(selection_hint={(e['id'], f"{e['start_line']}.{e['start_char']}",
+                                                       f"{e['end_line']}.{e['end_char']}", new_tag) for _, e, _ in rows})
+            return
+        tree.selection_set(new_iids)
+        self.root.after(20, self._finish_entities_tree_rebuild)
+
+        # Relation rows show "[tag]" next to the entity text.
+        relabeled_ids = {entity['id'] for _, entity, _ in rows}
+        for rel in self.annotations.get(self.current_file_path, {}).get("relations", []):
+            if rel['head_id'] in relabeled_ids or rel['tail_id'] in relabeled_ids: self._update_relation_row(rel)